@@ -14,6 +14,7 @@ Tool Categories:
 # Import all tools from specialized modules
 from .pdf_tools import (
     extract_text_from_pdf,
+    extract_text_from_pdf_until,
     extract_tables_from_pdf,
     extract_metadata_from_pdf,
     parse_coa_pdf,
@@ -99,6 +100,7 @@ from .document_renderer import (
 __all__ = [
     # PDF Tools
     'extract_text_from_pdf',
+    'extract_text_from_pdf_until',
     'extract_tables_from_pdf',
     'extract_metadata_from_pdf',
     'parse_coa_pdf',
@@ -26,6 +26,7 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 # Import necessary tools from other modules
 from .word_tools import extract_text_from_docx, extract_tables_from_docx, extract_metadata_from_docx
 from .excel_tools import extract_data_from_xlsx, parse_batch_data_xlsx
+from .json_codec import loads, write_json
 
 
 def parse_json_data(data_string: str) -> Dict[str, Any]:
@@ -41,7 +42,7 @@ def parse_json_data(data_string: str) -> Dict[str, Any]:
     try:
         if isinstance(data_string, dict):
             return data_string
-        return json.loads(data_string)
+        return loads(data_string)
     except:
         return {"status": "error", "documents": []}
 
@@ -200,7 +201,7 @@ def extract_section_data(section_name: str, domain: str, query: str, domain_agen
         # Parse the result (may be JSON string or dict)
         if isinstance(result, str):
             try:
-                parsed_result = json.loads(result)
+                parsed_result = loads(result)
             except json.JSONDecodeError:
                 # Result is plain text, wrap it
                 parsed_result = {
@@ -486,8 +487,7 @@ def create_completion_report(sections_status: Dict[str, Any]) -> Dict[str, Any]:
         
         # Save report to JSON file
         report_path = OUTPUT_DIR / f"completion_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(completion_report, f, indent=2)
+        write_json(report_path, completion_report)
         
         logger.info(f"✅ Completion report generated: {report_path}")
         logger.info(f"   Completion: {completion_percentage}%, Quality Score: {data_quality_score}")
@@ -3,7 +3,6 @@ APQR Generator from Real Extracted Data Index
 Uses ONLY real data from document_index.json - NO FABRICATION
 """
 
-import json
 import sys
 import base64
 from pathlib import Path
@@ -15,6 +14,8 @@ import logging
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from tools.json_codec import read_json
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -26,8 +27,7 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 def load_document_index():
     """Load the real extracted data index"""
     index_path = BASE_DIR / "output" / "document_index.json"
-    with open(index_path, 'r') as f:
-        return json.load(f)
+    return read_json(index_path)
 
 
 def generate_apqr_from_real_data(product_name: str = "Aspirin"):
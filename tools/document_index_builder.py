@@ -3,7 +3,6 @@ Document Index Builder
 Systematically extract and index all REAL data from APQR_Segregated database
 """
 
-import json
 import sys
 import re
 from pathlib import Path
@@ -16,6 +15,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from tools.pdf_tools import extract_text_from_pdf
 from tools.word_tools import extract_text_from_docx, extract_tables_from_docx
 from tools.excel_tools import extract_data_from_xlsx
+from tools.json_codec import write_json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -313,10 +313,7 @@ class DocumentIndexBuilder:
             output_path = BASE_DIR / "output" / "document_index.json"
         
         output_path = Path(output_path)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_path, 'w') as f:
-            json.dump(self.index, f, indent=2)
+        write_json(output_path, self.index)
         
         logger.info(f"✅ Index saved to: {output_path}")
         return output_path
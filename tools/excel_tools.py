@@ -13,6 +13,11 @@ logger = logging.getLogger(__name__)
 import pandas as pd
 from openpyxl import load_workbook
 
+try:
+    from .parse_cache import file_cache
+except ImportError:
+    from parse_cache import file_cache
+
 
 def extract_sheets_from_xlsx(xlsx_path: str) -> List[str]:
     """
@@ -80,6 +85,7 @@ def extract_data_from_xlsx(xlsx_path: str, sheet_name: Optional[str] = None) ->
         return {"error": str(e)}
 
 
+@file_cache()
 def parse_batch_data_xlsx(xlsx_path: str) -> Dict[str, Any]:
     """
     Parse batch production data from Excel file.
@@ -143,6 +149,7 @@ def parse_batch_data_xlsx(xlsx_path: str) -> Dict[str, Any]:
         }
 
 
+@file_cache()
 def parse_kpi_data_xlsx(xlsx_path: str) -> Dict[str, Any]:
     """
     Parse KPI data from Excel file.
@@ -0,0 +1,118 @@
+"""
+JSON Codec - Fast JSON encoding/decoding shared by the APQR tools.
+Uses orjson when it is installed and falls back to the stdlib json module.
+Output is compact by default, with 2-space indentation opt-in (indent=True, or
+APQR_PRETTY_JSON for tool responses); both encoders produce identical UTF-8
+(non-escaped) output in either mode.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the stdlib encoder
+    orjson = None
+
+
+def dumps_bytes(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON.
+
+    Args:
+        obj: JSON-serializable object
+        indent: Pretty-print with 2-space indentation
+        default: Fallback for types the encoder does not support (e.g. str)
+
+    Returns:
+        UTF-8 encoded JSON document
+    """
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=default, option=option)
+    # Compact output uses orjson's separators so both encoders produce the same bytes
+    return json.dumps(obj, indent=2 if indent else None, default=default, ensure_ascii=False,
+                      separators=None if indent else (",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize an object to a JSON string (see dumps_bytes for arguments)."""
+    return dumps_bytes(obj, indent=indent, default=default).decode("utf-8")
+
+
+def dumps_with_documents(fields: Dict[str, Any], documents: List[bytes], indent: bool = True) -> str:
+    """
+    Serialize a tool result whose "documents" were encoded one at a time.
+    
+    Each document is encoded with dumps_bytes(doc, indent=indent) as soon as it is
+    parsed, so the full result never exists as one nested structure. The output is
+    identical to dumps({**fields, "documents": [...]}, indent=indent). The documents
+    list is consumed (emptied) so its encodings are released before decoding.
+    
+    Args:
+        fields: Result fields written before the documents list
+        documents: JSON encodings of the documents, in order
+        indent: Whether the result (and the documents) use 2-space indentation
+        
+    Returns:
+        JSON string with "documents" as the last key
+    """
+    head = dumps_bytes(fields, indent=indent)
+    if indent:
+        prefix = head[:-2] + b",\n" if fields else b"{\n"
+        opening, separator, closing = b'  "documents": [\n    ', b",\n    ", b"\n  ]\n}"
+        empty = b'  "documents": []\n}'
+    else:
+        prefix = head[:-1] + b"," if fields else b"{"
+        opening, separator, closing = b'"documents":[', b",", b"]}"
+        empty = b'"documents":[]}'
+    if not documents:
+        return (prefix + empty).decode("utf-8")
+    
+    if indent:
+        # Documents sit two levels deep; JSON strings never contain raw newlines. Re-indenting
+        # in place releases each original encoding as soon as its replacement exists.
+        for index, doc in enumerate(documents):
+            documents[index] = doc.replace(b"\n", b"\n    ")
+    documents[0] = prefix + opening + documents[0]
+    documents[-1] += closing
+    data = separator.join(documents)
+    documents.clear()
+    return data.decode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON document from str or bytes."""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def read_json(path: Union[str, Path]) -> Any:
+    """Read and parse a JSON file in one binary read."""
+    return loads(Path(path).read_bytes())
+
+
+def write_json(path: Union[str, Path], obj: Any, indent: bool = True,
+               default: Optional[Callable[[Any], Any]] = None) -> None:
+    """
+    Write an object to a JSON file atomically.
+
+    Args:
+        path: Destination file
+        obj: JSON-serializable object
+        indent: Pretty-print with 2-space indentation
+        default: Fallback for types the encoder does not support
+    """
+    write_bytes(path, dumps_bytes(obj, indent=indent, default=default))
+
+
+def write_bytes(path: Union[str, Path], data: bytes) -> None:
+    """Write already-encoded JSON (or any bytes) to a file atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per process and thread so concurrent writers never share a temp file
+    tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
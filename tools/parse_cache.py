@@ -0,0 +1,148 @@
+"""
+Parse Cache - On-disk memoization for deterministic document parsers.
+Parsed results are keyed by (parser and version, absolute path, mtime_ns, size), so
+unchanged files skip PDF/DOCX/XLSX parsing entirely, while an edited file or a parser
+whose version was bumped simply misses the cache.
+"""
+
+import copy
+import functools
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    from .json_codec import dumps_bytes, loads, write_bytes
+except ImportError:
+    from json_codec import dumps_bytes, loads, write_bytes
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CACHE_DIR = BASE_DIR / ".cache" / "docparse"
+
+# Part of every cache key: bump it when the entry format or shared parsing code changes so
+# existing entries are ignored (a single parser's output change bumps its own version=)
+CACHE_VERSION = 1
+
+
+def _cache_key(namespace: str, file_path: str, stat: os.stat_result,
+               args: tuple = (), kwargs: Optional[Dict[str, Any]] = None) -> str:
+    """Build a stable cache key from the parser name and version, the file's identity and any extra arguments."""
+    raw = f"{CACHE_VERSION}|{namespace}|{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+    if args or kwargs:
+        raw += f"|{args!r}|{sorted((kwargs or {}).items())!r}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _is_cacheable(result: Any) -> bool:
+    """Only successful results are cached: dicts without "error", text not starting with "Error"."""
+    if isinstance(result, dict):
+        return "error" not in result
+    return isinstance(result, str) and not result.startswith("Error")
+
+
+def _load_entry(entry_path: Path) -> Optional[Union[Dict[str, Any], str]]:
+    """Load a cached result, returning None on a miss or an unreadable entry."""
+    try:
+        data = entry_path.read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        return loads(data)
+    except ValueError as e:
+        logger.warning(f"Discarding corrupt parse cache entry {entry_path.name}: {e}")
+        return None
+
+
+def _store_entry(entry_path: Path, result: Union[Dict[str, Any], str]) -> Union[Dict[str, Any], str]:
+    """
+    Write a result atomically so concurrent readers never see a partial file.
+    
+    Returns the result as a later cache hit will load it (e.g. None keys become "null",
+    tuples become lists), so a cold call returns exactly what warm calls do.
+    """
+    data = dumps_bytes(result, default=str)
+    write_bytes(entry_path, data)
+    return result if isinstance(result, str) else loads(data)
+
+
+def file_cache(cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR, memory_entries: int = 0,
+               version: int = 0) -> Callable:
+    """
+    Cache a single-path parser's result on disk.
+
+    The decorated function must take the document path as its first argument and
+    return a JSON-serializable dict or extracted text; any further arguments become
+    part of the cache key. Results containing an "error" key and text starting with
+    "Error" are never cached, so transient failures are retried on the next call.
+
+    With memory_entries set, the most recently used results are also kept in memory
+    under the same key, so a warm call skips reading and decoding the cache entry.
+    Memory hits return a shallow copy, so callers may replace top-level keys freely.
+
+    Args:
+        cache_dir: Directory for cache entries (relative paths resolve against the project root)
+        memory_entries: Number of results to keep in memory per parser (0 disables it)
+        version: Parser output version; bump it whenever the decorated parser's output
+            changes so entries written by the old code are no longer served
+
+    Returns:
+        Decorator wrapping the parser with the on-disk cache
+    """
+    cache_root = Path(cache_dir)
+    if not cache_root.is_absolute():
+        cache_root = BASE_DIR / cache_root
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        namespace = f"{func.__module__}.{func.__qualname__}:v{version}"
+        memory: "OrderedDict[str, Any]" = OrderedDict()
+        memory_lock = threading.Lock()
+
+        def remember(key: str, result: Any) -> None:
+            if memory_entries <= 0:
+                return
+            with memory_lock:
+                memory[key] = result
+                memory.move_to_end(key)
+                while len(memory) > memory_entries:
+                    memory.popitem(last=False)
+
+        @functools.wraps(func)
+        def wrapper(file_path: str, *args, **kwargs) -> Any:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                # Let the parser produce its usual "file not found" response
+                return func(file_path, *args, **kwargs)
+
+            key = _cache_key(namespace, str(file_path), stat, args, kwargs)
+            with memory_lock:
+                if key in memory:
+                    memory.move_to_end(key)
+                    return copy.copy(memory[key])
+
+            entry_path = cache_root / f"{key}.json"
+            cached = _load_entry(entry_path)
+            if cached is not None:
+                logger.info(f"Parse cache hit for {Path(file_path).name}")
+                remember(key, cached)
+                return copy.copy(cached) if memory_entries > 0 else cached
+
+            result = func(file_path, *args, **kwargs)
+            if _is_cacheable(result):
+                try:
+                    result = _store_entry(entry_path, result)
+                except (OSError, TypeError, ValueError) as e:
+                    logger.warning(f"Could not write parse cache for {file_path}: {e}")
+                remember(key, result)
+                return copy.copy(result) if memory_entries > 0 else result
+            return result
+
+        return wrapper
+
+    return decorator
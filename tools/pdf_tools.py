@@ -6,19 +6,26 @@ Handles PDF document processing for LIMS, ERP, and DMS agents.
 import logging
 import re
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 import pdfplumber
 
+try:
+    from .parse_cache import file_cache
+except ImportError:
+    from parse_cache import file_cache
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+
+@file_cache()
+def extract_text_from_pdf(pdf_path: str, max_pages: Optional[int] = None) -> str:
     """
     Extract text content from PDF file.
     
     Args:
         pdf_path: Path to PDF file
+        max_pages: Only extract the first N pages (None extracts the whole document)
         
     Returns:
         Extracted text content
@@ -32,7 +39,8 @@ def extract_text_from_pdf(pdf_path: str) -> str:
         
         text_content = ""
         with pdfplumber.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, 1):
+            pages = pdf.pages if max_pages is None else pdf.pages[:max_pages]
+            for page_num, page in enumerate(pages, 1):
                 page_text = page.extract_text()
                 if page_text:
                     text_content += f"\n--- Page {page_num} ---\n{page_text}\n"
@@ -43,6 +51,48 @@ def extract_text_from_pdf(pdf_path: str) -> str:
         return f"Error: {str(e)}"
 
 
+@file_cache()
+def extract_text_from_pdf_until(pdf_path: str, needle: str, context: int = 0) -> str:
+    """
+    Extract PDF text page by page, stopping once a search window has been read.
+    
+    Returns the same text as extract_text_from_pdf, cut after the first page at which
+    the (case-insensitive) needle and `context` characters after it are available.
+    If that never happens the whole document is returned.
+    
+    Args:
+        pdf_path: Path to PDF file
+        needle: Lowercase text to look for
+        context: Characters required after the start of the needle
+        
+    Returns:
+        Extracted text content up to the page completing the window
+    """
+    logger.info(f"Extracting text from PDF until '{needle}': {pdf_path}")
+    
+    try:
+        path = Path(pdf_path)
+        if not path.exists():
+            return f"Error: File not found: {pdf_path}"
+        
+        text_content = ""
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_num, page in enumerate(pdf.pages, 1):
+                page_text = page.extract_text()
+                if not page_text:
+                    continue
+                text_content += f"\n--- Page {page_num} ---\n{page_text}\n"
+                text = text_content.strip()
+                needle_idx = text.lower().find(needle)
+                if needle_idx != -1 and needle_idx + context <= len(text):
+                    return text
+        
+        return text_content.strip()
+    except Exception as e:
+        logger.error(f"Error extracting text from PDF: {e}")
+        return f"Error: {str(e)}"
+
+
 def extract_tables_from_pdf(pdf_path: str) -> List[Dict[str, Any]]:
     """
     Extract tables from PDF file.
@@ -118,6 +168,56 @@ def extract_metadata_from_pdf(pdf_path: str) -> Dict[str, Any]:
         return {"error": str(e)}
 
 
+def _read_pdf(pdf_path: str, with_tables: bool = False) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Read a PDF's text layer, tables and metadata from a single open.
+    
+    Produces the same values as extract_text_from_pdf, extract_tables_from_pdf and
+    extract_metadata_from_pdf without re-opening and re-parsing the document for each.
+    Table detection only runs on pages that have a text layer - an image-only page
+    has no characters to fill table cells with, so its layout analysis is skipped.
+    
+    Args:
+        pdf_path: Path to PDF file
+        with_tables: Also extract tables
+        
+    Returns:
+        Tuple of (text, tables, metadata)
+    """
+    path = Path(pdf_path)
+    stat = path.stat()
+    metadata = {
+        "filename": path.name,
+        "size_bytes": stat.st_size,
+        "size_kb": round(stat.st_size / 1024, 2),
+        "path": str(path),
+        "exists": True
+    }
+    
+    text_parts = []
+    tables = []
+    with pdfplumber.open(pdf_path) as pdf:
+        metadata["num_pages"] = len(pdf.pages)
+        metadata["pdf_metadata"] = pdf.metadata
+        for page_num, page in enumerate(pdf.pages, 1):
+            page_text = page.extract_text()
+            if page_text:
+                text_parts.append(f"\n--- Page {page_num} ---\n{page_text}\n")
+            if not with_tables or not page.chars:
+                continue
+            for table_idx, table in enumerate(page.extract_tables(), 1):
+                tables.append({
+                    "page": page_num,
+                    "table_id": f"page{page_num}_table{table_idx}",
+                    "data": table,
+                    "rows": len(table),
+                    "columns": len(table[0]) if table else 0
+                })
+    
+    return "".join(text_parts).strip(), tables, metadata
+
+
+@file_cache()
 def parse_coa_pdf(pdf_path: str) -> Dict[str, Any]:
     """
     Parse Certificate of Analysis (COA) from PDF.
@@ -131,8 +231,7 @@ def parse_coa_pdf(pdf_path: str) -> Dict[str, Any]:
     logger.info(f"Parsing COA from PDF: {pdf_path}")
     
     try:
-        text = extract_text_from_pdf(pdf_path)
-        tables = extract_tables_from_pdf(pdf_path)
+        text, tables, metadata = _read_pdf(pdf_path, with_tables=True)
         
         # Extract material name (typically in filename or early in document)
         material_name = Path(pdf_path).stem.replace("COA_", "")
@@ -145,7 +244,7 @@ def parse_coa_pdf(pdf_path: str) -> Dict[str, Any]:
             "raw_text": text,
             "tables": tables,
             "test_results": [],
-            "metadata": extract_metadata_from_pdf(pdf_path)
+            "metadata": metadata
         }
         
         # Extract batch/lot number patterns
@@ -181,6 +280,7 @@ def parse_coa_pdf(pdf_path: str) -> Dict[str, Any]:
         }
 
 
+@file_cache()
 def parse_sds_pdf(pdf_path: str) -> Dict[str, Any]:
     """
     Parse Safety Data Sheet (SDS) from PDF.
@@ -194,7 +294,7 @@ def parse_sds_pdf(pdf_path: str) -> Dict[str, Any]:
     logger.info(f"Parsing SDS from PDF: {pdf_path}")
     
     try:
-        text = extract_text_from_pdf(pdf_path)
+        text, _, metadata = _read_pdf(pdf_path)
         
         # Extract chemical name (typically in filename or early in document)
         chemical_name = Path(pdf_path).stem.replace("SDS_", "")
@@ -208,7 +308,7 @@ def parse_sds_pdf(pdf_path: str) -> Dict[str, Any]:
             "hazards": [],
             "handling_precautions": [],
             "storage_conditions": [],
-            "metadata": extract_metadata_from_pdf(pdf_path)
+            "metadata": metadata
         }
         
         # Extract SDS sections (typically numbered 1-16)
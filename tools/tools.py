@@ -9,19 +9,36 @@ Tools Architecture:
 - DMS Tools: Access APQR_Segregated/DMS/ (SOPs, Training records, CAPA documents)
 """
 
+import bisect
+import functools
+import heapq
 import logging
+import multiprocessing
 import os
-import json
+import pickle
 import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# pyahocorasick is optional - a plain substring scan is used when it is missing
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Import parsing tools
-from .pdf_tools import parse_coa_pdf, parse_sds_pdf, extract_text_from_pdf
+from .pdf_tools import parse_coa_pdf, parse_sds_pdf, extract_text_from_pdf, extract_text_from_pdf_until
 from .word_tools import parse_bmr_docx, parse_sop_docx, extract_text_from_docx
 from .excel_tools import parse_batch_data_xlsx, parse_kpi_data_xlsx, extract_data_from_xlsx
+from .json_codec import dumps, dumps_bytes, dumps_with_documents, read_json
+from .sop_index_builder import sop_index_columns
 
 # Get the base path for APQR_Segregated
 BASE_DIR = Path(__file__).resolve().parent.parent  # Go up to agentic_apqr folder
@@ -31,6 +48,120 @@ ERP_DOCS_DIR = APQR_DATA_DIR / "ERP"
 DMS_DOCS_DIR = APQR_DATA_DIR / "DMS"
 METADATA_DIR = BASE_DIR / "database_metadata"
 
+# Batch identifiers as they appear in queries and filenames (e.g. ASP-25-002)
+_BATCH_ID_RE = re.compile(r'ASP-\d{2}-\d{3}', re.IGNORECASE)
+
+# Materials recognised in COA filenames, checked in order
+_COA_MATERIALS = ("API", "Binder", "Diluent", "Disintegrant", "Lubricant")
+
+# Supply chain filenames: PO/requisition documents (Batch 1 style), or a material name
+# together with a batch reference (Batch 2-4 style, e.g. "Binder - ASP-25-002.docx").
+# The cheap "ASP" lookahead gates the material alternation, so names without a batch
+# reference fail after one literal scan.
+_SUPPLY_CHAIN_MATERIALS = ('API', 'Binder', 'Diluent', 'Disintegrant', 'Lubricant',
+                           'HPMC', 'MCC', 'Cornstarch', 'Magnesium', 'Salicylic')
+_SUPPLY_CHAIN_NAME_RE = re.compile(
+    r"Purchase Order|Requisition|PO-|Req\. Slip"
+    r"|^(?=.*ASP).*(?:" + "|".join(_SUPPLY_CHAIN_MATERIALS) + r")"
+)
+
+# Document queries that only ask about which documents exist ("how many POs are there?")
+# are answered from the manifest, unless they also ask for something inside the documents
+_METADATA_QUERY_RE = re.compile(
+    r"\b(?:how many|count|number of|which (?:files|documents)|list (?:the |all )?(?:files|documents)"
+    r"|available|exists?)\b", re.IGNORECASE)
+# (terms are matched as word prefixes, so "quantit" covers quantity and quantities)
+_CONTENT_TERMS = (r"show|content|text|hazard|quantit|amount|specify|detail|list item|read"
+                  r"|vendor|supplier|price|cost|grade|spec|section|ingredient|flash|composition"
+                  r"|unit|total|what|how much|when|where|which\b.*\b(?:mention|contain)")
+_NEEDS_CONTENT_RE = re.compile(rf"\b(?:{_CONTENT_TERMS})", re.IGNORECASE)
+# Regulatory (SDS) queries also need the parsed sheets for safety and handling questions
+_NEEDS_SDS_CONTENT_RE = re.compile(
+    rf"\b(?:{_CONTENT_TERMS}|ppe|first aid|exposure|toxic|storage|store|handling|required"
+    r"|protect|precaution|firefight|disposal|spill|classif)", re.IGNORECASE)
+
+# SOP number named in a DMS QA query (e.g. "SOP-QA-001"), and the query words used for SOP search
+_SOP_NUMBER_RE = re.compile(r'SOP[_-]([A-Z]+)[_-](\d+)', re.IGNORECASE)
+_SEARCH_TERM_RE = re.compile(r'\b[a-z]{3,}\b')
+
+# Query keywords (matched anywhere in the lowercased query) that route a DMS QA query to SOP search
+_SOP_QUERY_KEYWORDS = ('sop', 'standard operating procedure', 'version', 'procedure', 'bmr', 'ppe', 'hplc',
+                       'batch', 'safety', 'equipment', 'manufacturing', 'packaging', 'warehouse',
+                       'calibration', 'cleaning', 'sampling')
+
+# Query keywords that route a supply chain query to the SDS branch
+_SDS_QUERY_KEYWORDS = ('sds', 'safety data sheet', 'msds', 'material safety', 'hazard', 'safety')
+
+# SDS filename patterns for each material a supply chain query can name
+_SDS_MATERIAL_PATTERNS = {
+    'api': ('SDS_API', 'Salicylic'),
+    'binder': ('SDS_Binder', 'HPMC'),
+    'filler': ('SDS_Filler', 'MCC', 'Cellulose'),
+    'diluent': ('SDS_Filler', 'MCC', 'Cellulose'),
+    'disintegrant': ('SDS_Disintegrant', 'Cornstarch'),
+    'lubricant': ('SDS_Lubricant', 'Magnesium', 'Stearate'),
+    'pvc': ('PVC', 'Film'),
+    'foil': ('Foil', 'Lidding')
+}
+_SDS_PATTERN_MATERIALS: Dict[str, List[str]] = {}
+for _material, _patterns in _SDS_MATERIAL_PATTERNS.items():
+    for _pattern in _patterns:
+        _SDS_PATTERN_MATERIALS.setdefault(_pattern, []).append(_material)
+del _material, _patterns, _pattern
+
+# Longest raw_text embedded per document in a tool response (extracted fields are kept in full)
+MAX_RAW_TEXT_CHARS = 64 * 1024
+
+# Document tool responses are compact JSON; set APQR_PRETTY_JSON=1 for 2-space indented output when debugging
+PRETTY_JSON = os.environ.get("APQR_PRETTY_JSON", "").lower() in ("1", "true", "yes")
+
+# Total raw_text embedded in one supply chain response; documents past it carry a preview instead
+SUPPLY_CHAIN_TEXT_BUDGET = 50_000
+TEXT_PREVIEW_CHARS = 2_000
+
+# Characters from the first "hazard" shown in an SDS preview (pages past that are not read)
+SDS_HAZARD_WINDOW = 200
+
+# In-memory parse results, least recently used first: {(parser, path, mtime_ns, size, args): result}
+_PARSE_CACHE: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+_PARSE_CACHE_LOCK = threading.Lock()
+PARSE_CACHE_MAX_ENTRIES = 512
+
+# Shared pool for per-document parsing; pdfplumber/python-docx spend much of their time in file I/O
+_PARSE_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="doc-parse")
+
+# Worker processes for cache-miss parsing: pdfplumber/python-docx are pure Python and hold
+# the GIL, so on multi-core hosts the pool threads hand the CPU work to processes.
+# With a single worker, parsing simply runs on the pool thread.
+PARSE_PROCESSES = min(8, os.cpu_count() or 1)
+_PARSE_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+_PARSE_PROCESS_POOL_LOCK = threading.Lock()
+
+
+def _build_keyword_automaton(keywords) -> Any:
+    """Build one Aho-Corasick automaton over fixed keywords (None without pyahocorasick)."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+def _keywords_in(text: str, keywords, automaton: Any) -> set:
+    """Return the keywords occurring in text, in a single automaton pass when available."""
+    if automaton is not None:
+        return {keyword for _, keyword in automaton.iter(text)}
+    return {keyword for keyword in keywords if keyword in text}
+
+
+_COA_MATERIAL_AUTOMATON = _build_keyword_automaton(_COA_MATERIALS)
+_SDS_PATTERN_AUTOMATON = _build_keyword_automaton(_SDS_PATTERN_MATERIALS)
+_SDS_QUERY_AUTOMATON = _build_keyword_automaton(_SDS_QUERY_KEYWORDS)
+_SDS_MATERIAL_AUTOMATON = _build_keyword_automaton(_SDS_MATERIAL_PATTERNS)
+_SOP_QUERY_AUTOMATON = _build_keyword_automaton(_SOP_QUERY_KEYWORDS)
+
 
 def read_database_index(domain: str) -> str:
     """
@@ -43,72 +174,623 @@ def read_database_index(domain: str) -> str:
         Content of the index file as string, or empty string if not found
     """
     try:
+        # Within the TTL the cached text is returned without touching the filesystem
+        now = time.monotonic()
+        cached = _DATABASE_INDEX_CACHE.get(domain)
+        if cached and now - cached[1] < MANIFEST_TTL_SECONDS:
+            return cached[2]
+        
         index_file = METADATA_DIR / f"{domain}_INDEX.txt"
-        if index_file.exists():
-            with open(index_file, 'r', encoding='utf-8') as f:
-                return f.read()
-        else:
+        try:
+            mtime_ns = index_file.stat().st_mtime_ns
+        except FileNotFoundError:
             logger.warning(f"Database index not found: {index_file}")
             return ""
+        
+        # Re-read only when the index file has changed since the last check
+        if cached and cached[0] == mtime_ns:
+            _DATABASE_INDEX_CACHE[domain] = (mtime_ns, now, cached[2])
+            return cached[2]
+        with open(index_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        _DATABASE_INDEX_CACHE[domain] = (mtime_ns, now, content)
+        return content
     except Exception as e:
         logger.error(f"Error reading database index for {domain}: {e}")
         return ""
 
 
-def list_available_documents(directory: Path) -> List[Path]:
+def read_sop_index() -> Dict[str, Any]:
     """
-    List all documents available in a directory (recursively searches all subdirectories).
+    Load output/sop_index.json, parsing it again only when the file changes.
+    
+    Like the database indexes, the parsed index is trusted for MANIFEST_TTL_SECONDS
+    and then re-validated against the file's mtime and size. Callers must treat the
+    returned dict as read-only since it is shared between calls.
+    
+    Returns:
+        The parsed SOP index, or an empty dict if it has not been built
+    """
+    global _SOP_INDEX_CACHE
+    now = time.monotonic()
+    cached = _SOP_INDEX_CACHE
+    if cached and now - cached[2] < MANIFEST_TTL_SECONDS:
+        return cached[3]
+    
+    try:
+        stat = SOP_INDEX_PATH.stat()
+    except FileNotFoundError:
+        _SOP_INDEX_CACHE = None
+        return {}
+    
+    if cached and (cached[0], cached[1]) == (stat.st_mtime_ns, stat.st_size):
+        index = cached[3]
+    else:
+        index = read_json(SOP_INDEX_PATH)
+        logger.info(f"✅ SOP index loaded: {index['metadata']['total_sops']} SOPs indexed")
+    _SOP_INDEX_CACHE = (stat.st_mtime_ns, stat.st_size, now, index)
+    return index
+
+
+def _version_number(version: Any) -> float:
+    """Numeric SOP version used to pick the current version (0.0 when missing or not numeric)."""
+    try:
+        return float(version or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _text_blob(texts: List[str]) -> Tuple[str, List[int]]:
+    """Join per-SOP texts with newlines, returning the blob and each text's start offset."""
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + 1
+    return "\n".join(texts), starts
+
+
+def _blob_matches(blob: str, starts: List[int], term: str) -> Iterator[int]:
+    """Yield the position of each SOP whose text contains term (terms never contain newlines)."""
+    found = blob.find(term)
+    while found != -1:
+        position = bisect.bisect_right(starts, found) - 1
+        yield position
+        if position + 1 >= len(starts):
+            return
+        found = blob.find(term, starts[position + 1])
+
+
+def _sop_search_index(sop_index: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build (once per loaded SOP index) the lookup structures used by SOP semantic search.
+    
+    Works from the column view of the index (sop_index_columns), so each structure is
+    built from a single field's column. Aliases and keywords map to the positions of
+    the SOPs listing them (once per listing, so repeated entries keep their weight).
+    Titles, purposes and departments are lowercased once and joined into
+    newline-separated blobs, so each query term is located across all SOPs with one
+    str.find scan. Numeric versions are converted once.
+    """
+    global _SOP_SEARCH_CACHE
+    cached = _SOP_SEARCH_CACHE
+    if cached and cached[0] is sop_index:
+        return cached[1]
+    
+    columns = sop_index_columns(sop_index)
+    keys = columns["keys"]
+    aliases: Dict[str, List[int]] = {}
+    keywords: Dict[str, List[int]] = {}
+    for position, sop_aliases in enumerate(columns["aliases"]):
+        for alias in sop_aliases:
+            aliases.setdefault(alias, []).append(position)
+    for position, sop_keywords in enumerate(columns["keywords"]):
+        for keyword in sop_keywords:
+            keywords.setdefault(keyword, []).append(position)
+    
+    search = {
+        "keys": keys,
+        "aliases": aliases,
+        "alias_automaton": _build_keyword_automaton(alias for alias in aliases if alias),
+        "keywords": keywords,
+        "titles": _text_blob([(title or '').lower() for title in columns["title"]]),
+        "purposes": _text_blob([(purpose or '').lower() for purpose in columns["purpose"]]),
+        "departments": _text_blob([(department or '').lower() for department in columns["department"]]),
+        "versions": dict(zip(keys, map(_version_number, columns["version"]))),
+    }
+    _SOP_SEARCH_CACHE = (sop_index, search)
+    return search
+
+
+def _sop_department_listing(sop_index: Dict[str, Any]) -> str:
+    """
+    Render the "list all SOPs" body (totals, SOPs by department, index footer).
+    
+    The text depends only on the SOP index, so it is built on first use and kept with
+    the index's search structures until the index file changes.
+    """
+    search = _sop_search_index(sop_index)
+    listing = search.get("department_listing")
+    if listing is not None:
+        return listing
+    
+    # Group by department
+    by_department = defaultdict(list)
+    for sop_key, sop_data in sop_index['sops'].items():
+        # Only show latest version (exclude versioned keys like "SOP-X_v2")
+        if '_v' not in sop_key:
+            by_department[sop_data.get('department', 'Unknown')].append(sop_data)
+    
+    parts = [f"""**Total SOPs:** {sop_index['metadata']['total_sops']} documents
+**Latest Versions:** {len([k for k in sop_index['sops'].keys() if '_v' not in k])} SOPs
+
+**SOPs by Department:**
+
+"""]
+    for dept, sops in sorted(by_department.items()):
+        parts.append(f"\n**{dept}**\n")
+        for sop in sorted(sops, key=lambda x: x.get('sop_number', '')):
+            version_info = f"v{sop.get('version', '?')}" if sop.get('version') else ''
+            parts.append(f"- {sop.get('sop_number', 'Unknown')} {version_info}\n")
+    
+    parts.append(f"\n📅 **Index last updated:** {sop_index['metadata']['indexed_at']}\n")
+    parts.append(f"📊 **Data Source:** {sop_index['metadata']['dms_path']}\n")
+    
+    listing = search["department_listing"] = "".join(parts)
+    return listing
+
+
+def _score_sops(sop_index: Dict[str, Any], query_lower: str, search_terms: List[str]) -> Dict[str, Tuple[Dict[str, Any], int]]:
+    """
+    Score SOPs against a query through the inverted search index.
+    
+    Scoring: +10 per alias found in the query, +5 per keyword that is a query term,
+    +3 / +1 per query term found in the title / purpose, and +2 if any query term is
+    found in the department. Only SOPs sharing something with the query are visited.
+    
+    Args:
+        sop_index: Parsed SOP index
+        query_lower: Lowercased query
+        search_terms: Words of the query (repeats count repeatedly)
+        
+    Returns:
+        {sop_key: (sop_data, score)} for SOPs scoring above zero, in index order
+    """
+    search = _sop_search_index(sop_index)
+    scores: Dict[int, int] = {}
+    
+    aliases = search["aliases"]
+    matched_aliases = _keywords_in(query_lower, aliases, search["alias_automaton"])
+    if "" in aliases:
+        matched_aliases.add("")  # An empty alias occurs in every query
+    for alias in matched_aliases:
+        for position in aliases[alias]:
+            scores[position] = scores.get(position, 0) + 10
+    
+    term_counts: Dict[str, int] = {}
+    for term in search_terms:
+        term_counts[term] = term_counts.get(term, 0) + 1
+    
+    department_matches = set()
+    for term, count in term_counts.items():
+        for position in search["keywords"].get(term, ()):
+            scores[position] = scores.get(position, 0) + 5
+        for position in _blob_matches(*search["titles"], term):
+            scores[position] = scores.get(position, 0) + 3 * count
+        for position in _blob_matches(*search["purposes"], term):
+            scores[position] = scores.get(position, 0) + count
+        department_matches.update(_blob_matches(*search["departments"], term))
+    for position in department_matches:
+        scores[position] = scores.get(position, 0) + 2
+    
+    keys = search["keys"]
+    sops = sop_index['sops']
+    return {keys[position]: (sops[keys[position]], scores[position]) for position in sorted(scores)}
+
+
+# Per-directory document manifests: {directory: (tree signature, checked at, manifest)}
+_DOCUMENT_MANIFESTS: Dict[Path, Tuple[Tuple[int, ...], float, Dict[str, Any]]] = {}
+_MANIFEST_LOCK = threading.Lock()
+
+# Seconds a manifest (or database index) is trusted before it is re-checked for changes
+MANIFEST_TTL_SECONDS = 5.0
+
+# Database index text per domain: {domain: (index file mtime_ns, checked at, content)}
+_DATABASE_INDEX_CACHE: Dict[str, Tuple[int, float, str]] = {}
+
+# SOP index built by sop_index_builder, and its parsed contents: (mtime_ns, size, checked at, index)
+SOP_INDEX_PATH = BASE_DIR / "output" / "sop_index.json"
+_SOP_INDEX_CACHE: Optional[Tuple[int, int, float, Dict[str, Any]]] = None
+
+# Inverted search structures for the most recently loaded SOP index: (index, search index)
+_SOP_SEARCH_CACHE: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None
+
+# Filename tokens pre-bucketed in the manifest ('MSDS' files also land in 'SDS')
+MANIFEST_CATEGORIES = ("COA", "SDS")
+
+
+def _directory_signature(directory: Path) -> Tuple[int, ...]:
+    """
+    Collect the mtimes of a directory and all of its subdirectories.
+    
+    A directory's mtime changes whenever an entry is added, removed or renamed in it,
+    so this only stats directories - far cheaper than stat-ing every file.
+    
+    Args:
+        directory: Root of the tree
+        
+    Returns:
+        Tuple of st_mtime_ns values in traversal order
+    """
+    signature = []
+    pending = [str(directory)]
+    while pending:
+        current = pending.pop()
+        signature.append(os.stat(current).st_mtime_ns)
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+    return tuple(signature)
+
+
+def _scan_files(directory: Path) -> List[Tuple[Path, os.stat_result]]:
+    """
+    List every file under a directory, with its stat, using an iterative os.scandir walk.
+    
+    DirEntry type checks come from the directory listing itself, and each file's stat
+    is taken once here so listings never need to stat it again.
+    Order matches a top-down walk: a directory's files first, then its subdirectories.
+    """
+    files = []
+    pending = [str(directory)]
+    while pending:
+        subdirs = []
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    files.append((Path(entry.path), entry.stat()))
+        pending.extend(reversed(subdirs))
+    return files
+
+
+def _empty_manifest() -> Dict[str, Any]:
+    """Manifest for a missing or unreadable directory."""
+    return {"all": [], "stats": {}, "views": {}, **{category: [] for category in MANIFEST_CATEGORIES}}
+
+
+def _build_document_manifest(directory: Path) -> Dict[str, Any]:
+    """Walk a directory once and bucket its files by filename category in the same pass."""
+    scanned = _scan_files(directory)
+    all_files = []
+    manifest = {"all": all_files, "stats": dict(scanned), "views": {}}
+    buckets = [(category, manifest.setdefault(category, [])) for category in MANIFEST_CATEGORIES]
+    for doc, _ in scanned:
+        all_files.append(doc)
+        name = doc.name.upper()  # Uppercased once per file, not once per category
+        for category, bucket in buckets:
+            if category in name:
+                bucket.append(doc)
+    return manifest
+
+
+def get_document_manifest(directory: Path) -> Dict[str, Any]:
+    """
+    Get the cached document manifest for a directory, rebuilding it if the tree changed.
+    
+    Within MANIFEST_TTL_SECONDS of the last check the cached manifest is returned
+    without touching the filesystem; after that the directory signature is re-checked.
     
     Args:
         directory: Path to the directory
         
     Returns:
-        List of full Path objects for all files found recursively
+        Dictionary with 'all' (every file, recursively), 'stats' (each file's stat_result as
+        of the last rebuild), 'views' (see manifest_view) plus one list per MANIFEST_CATEGORIES entry
     """
     try:
-        if directory.exists():
-            # Recursively search for all files in subdirectories
-            all_files = []
-            for file_path in directory.rglob('*'):
-                if file_path.is_file():
-                    all_files.append(file_path)  # Return full Path object
-            return all_files
-        return []
+        if not directory.exists():
+            return _empty_manifest()
+        
+        with _MANIFEST_LOCK:
+            now = time.monotonic()
+            cached = _DOCUMENT_MANIFESTS.get(directory)
+            if cached and now - cached[1] < MANIFEST_TTL_SECONDS:
+                return cached[2]
+            
+            signature = _directory_signature(directory)
+            if cached and cached[0] == signature:
+                _DOCUMENT_MANIFESTS[directory] = (signature, now, cached[2])
+                return cached[2]
+            
+            manifest = _build_document_manifest(directory)
+            _DOCUMENT_MANIFESTS[directory] = (signature, now, manifest)
+            logger.info(f"📂 Indexed {len(manifest['all'])} documents in {directory.name}")
+            return manifest
     except Exception as e:
         logger.error(f"Error listing documents in {directory}: {e}")
-        return []
+        return _empty_manifest()
+
 
+def manifest_view(manifest: Dict[str, Any], name: str, build: Callable[[Dict[str, Any]], Any]) -> Any:
+    """
+    Get a value derived from a document manifest, computing it once per manifest.
+    
+    Manifests are replaced whenever their directory changes, so derived file lists and
+    rendered listings shared by the query tools are rebuilt exactly when needed.
+    The returned value is shared between calls and must be treated as read-only.
+    
+    Args:
+        manifest: Manifest from get_document_manifest
+        name: Name of the view
+        build: Function computing the view from the manifest
+        
+    Returns:
+        The cached view
+    """
+    views = manifest["views"]
+    if name not in views:
+        views[name] = build(manifest)
+    return views[name]
 
-def get_document_info(doc_path: Path) -> Dict[str, Any]:
+
+def _document_entries(manifest: Dict[str, Any], docs: List[Path], with_path: bool) -> str:
+    """Render the markdown entry (name, size and optionally path) of each existing document."""
+    entries = []
+    for doc_path in docs:
+        info = get_document_info(doc_path, manifest["stats"].get(doc_path))
+        if info.get('exists'):
+            entry = f"\n📄 **{info['filename']}**\n   - Size: {info['size_kb']} KB"
+            if with_path:
+                entry += f"\n   - Path: {info['path']}"
+            entries.append(entry + "\n")
+    return "".join(entries)
+
+
+def list_available_documents(directory: Path) -> List[Path]:
+    """
+    List all documents available in a directory (recursively searches all subdirectories).
+    
+    Args:
+        directory: Path to the directory
+        
+    Returns:
+        List of full Path objects for all files found recursively
+    """
+    return list(get_document_manifest(directory)["all"])
+
+
+def get_document_info(doc_path: Path, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
     """
     Get information about a document.
     
     Args:
         doc_path: Path to the document
+        stat: Precomputed stat_result (e.g. from the document manifest) to skip the stat call
         
     Returns:
         Dictionary with document metadata
     """
     try:
-        if doc_path.exists():
-            stat = doc_path.stat()
-            return {
-                "filename": doc_path.name,
-                "path": str(doc_path),
-                "size_bytes": stat.st_size,
-                "size_kb": round(stat.st_size / 1024, 2),
-                "exists": True
-            }
-        return {"filename": doc_path.name, "exists": False}
+        if stat is None:
+            try:
+                stat = doc_path.stat()  # One stat call instead of exists() + stat()
+            except (FileNotFoundError, NotADirectoryError):
+                return {"filename": doc_path.name, "exists": False}
+        return {
+            "filename": doc_path.name,
+            "path": str(doc_path),
+            "size_bytes": stat.st_size,
+            "size_kb": round(stat.st_size / 1024, 2),
+            "exists": True
+        }
     except Exception as e:
         logger.error(f"Error getting document info for {doc_path}: {e}")
         return {"error": str(e)}
 
 
+def _is_parse_error(result: Any) -> bool:
+    """Parsers report failures as an "error" dict or an "Error: ..." string."""
+    if isinstance(result, dict):
+        return "error" in result
+    return isinstance(result, str) and result.startswith("Error")
+
+
+def _parse_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared parse process pool, starting it on first use (None for one worker)."""
+    global _PARSE_PROCESS_POOL
+    if PARSE_PROCESSES <= 1:
+        return None
+    with _PARSE_PROCESS_POOL_LOCK:
+        if _PARSE_PROCESS_POOL is None:
+            # spawn, not fork: the parent already runs pool threads
+            _PARSE_PROCESS_POOL = ProcessPoolExecutor(max_workers=PARSE_PROCESSES,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+        return _PARSE_PROCESS_POOL
+
+
+def _run_parser(parser: Callable[..., Any], *args) -> Any:
+    """
+    Run a parser in the parse process pool, or on the calling thread when there is none.
+    
+    Falls back to the calling thread if the call cannot be pickled or the pool is broken.
+    Exceptions raised by the parser itself propagate unchanged.
+    
+    Args:
+        parser: Module-level parser function
+        *args: Arguments for the parser (document path first)
+        
+    Returns:
+        The parser's result
+    """
+    global _PARSE_PROCESS_POOL
+    pool = _parse_process_pool()
+    if pool is None:
+        return parser(*args)
+    try:
+        pickle.dumps((parser, args))
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        logger.warning(f"Could not send {args[0]} to a worker process, parsing in-thread: {e}")
+        return parser(*args)
+    try:
+        return pool.submit(parser, *args).result()
+    except BrokenProcessPool as e:
+        logger.warning(f"Parse process pool failed, restarting it: {e}")
+        with _PARSE_PROCESS_POOL_LOCK:
+            if _PARSE_PROCESS_POOL is pool:
+                _PARSE_PROCESS_POOL = None
+    return parser(*args)
+
+
+def cached_parse(doc_path: Path, parser: Callable[..., Any], *args) -> Any:
+    """
+    Run parser(str(doc_path), *args), reusing the result while the file is unchanged.
+    
+    Results are kept in memory keyed by (parser, path, mtime_ns, size, args) with LRU
+    eviction, so repeated tool calls skip re-parsing. Errors are never cached. Callers
+    must treat the returned object as read-only since it is shared between calls.
+    
+    Args:
+        doc_path: Document to parse
+        parser: Function taking the document path as a string
+        *args: Extra positional arguments for the parser (part of the cache key)
+        
+    Returns:
+        The parser's result
+    """
+    try:
+        stat = doc_path.stat()
+    except OSError:
+        return parser(str(doc_path), *args)
+    
+    key = (parser, str(doc_path), stat.st_mtime_ns, stat.st_size, args)
+    with _PARSE_CACHE_LOCK:
+        if key in _PARSE_CACHE:
+            _PARSE_CACHE.move_to_end(key)
+            return _PARSE_CACHE[key]
+    
+    result = _run_parser(parser, str(doc_path), *args)
+    if not _is_parse_error(result):
+        with _PARSE_CACHE_LOCK:
+            _PARSE_CACHE[key] = result
+            while len(_PARSE_CACHE) > PARSE_CACHE_MAX_ENTRIES:
+                _PARSE_CACHE.popitem(last=False)
+    return result
+
+
+def _cap_raw_text(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Limit a parsed record's raw_text to MAX_RAW_TEXT_CHARS for tool responses.
+    
+    Returns the record unchanged when it fits; otherwise a truncated copy flagged with
+    "raw_text_truncated", so cached parse results are never modified.
+    """
+    text = record.get("raw_text")
+    if not isinstance(text, str) or len(text) <= MAX_RAW_TEXT_CHARS:
+        return record
+    return {**record, "raw_text": text[:MAX_RAW_TEXT_CHARS], "raw_text_truncated": True}
+
+
+def _fit_text_budget(record: Dict[str, Any], remaining: int) -> Tuple[Dict[str, Any], int]:
+    """
+    Keep a record's raw_text if it fits the remaining response budget, else preview it.
+    
+    Returns the record (or a copy with raw_text replaced by "text_preview" and "text_len")
+    and the budget left afterwards.
+    """
+    text = record.get("raw_text")
+    if not isinstance(text, str):
+        return record, remaining
+    if len(text) <= remaining:
+        return record, remaining - len(text)
+    preview = {key: value for key, value in record.items() if key != "raw_text"}
+    preview["text_preview"] = text[:TEXT_PREVIEW_CHARS]
+    preview["text_len"] = len(text)
+    return preview, remaining
+
+
+def _needs_document_content(query: str, content_re: re.Pattern = _NEEDS_CONTENT_RE) -> bool:
+    """False for queries that only ask which documents exist and nothing about their contents."""
+    return not _METADATA_QUERY_RE.search(query) or bool(content_re.search(query))
+
+
+def _parallel_map(func: Callable[[Path], Any], items: List[Path]) -> Iterator[Any]:
+    """
+    Apply a per-document parser to items on the shared parse pool.
+    
+    Results come back in input order so tool output stays deterministic, and each
+    one is yielded as soon as it is ready so callers can consume while later
+    documents are still being parsed.
+    
+    Args:
+        func: Parser taking a single document path
+        items: Documents to parse
+        
+    Returns:
+        Iterator of func results, one per item
+    """
+    if len(items) <= 1:
+        return map(func, items)
+    return _PARSE_POOL.map(func, items)
+
+
 # =======================
 # LIMS Tools
 # =======================
 
+def _coa_batch(doc_path: Path) -> str:
+    """Batch a COA belongs to: batch 1 COAs are PDFs, later batches are named in the DOCX filename."""
+    if doc_path.suffix.lower() == '.pdf':
+        return "ASP-25-001"
+    batch_match = _BATCH_ID_RE.search(doc_path.name)
+    return batch_match.group(0).upper() if batch_match else "Unknown"
+
+
+def _coa_material(filename: str) -> str:
+    """Material named in a COA filename (first of _COA_MATERIALS, or "Unknown")."""
+    found = _keywords_in(filename, _COA_MATERIALS, _COA_MATERIAL_AUTOMATON)
+    return next((material for material in _COA_MATERIALS if material in found), "Unknown")
+
+
+def _parse_coa_document(path_str: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a single COA document.
+    
+    Args:
+        path_str: Path to the COA document
+        
+    Returns:
+        Parsed COA data, or None for unsupported formats
+    """
+    doc_path = Path(path_str)
+    suffix = doc_path.suffix.lower()
+    if suffix not in ('.pdf', '.docx'):
+        return None
+    
+    logger.info(f"Parsing COA: {doc_path.name} from {doc_path.parent}")
+    # Parse PDF documents (Batch 1)
+    if suffix == '.pdf':
+        coa_data = parse_coa_pdf(path_str)
+        coa_data['batch'] = _coa_batch(doc_path)
+        return _cap_raw_text(coa_data)
+    # Parse DOCX documents (Batch 2-4)
+    text = extract_text_from_docx(path_str)
+    return _cap_raw_text({
+        "filename": doc_path.name,
+        "batch": _coa_batch(doc_path),
+        "material": _coa_material(doc_path.name),
+        "raw_text": text,
+        "source": path_str
+    })
+
+
+def _parse_coa_path(doc_path: Path) -> Optional[Dict[str, Any]]:
+    """Parse a COA through the in-memory parse cache."""
+    return cached_parse(doc_path, _parse_coa_document)
+
+
 def query_lims_qc(query: str) -> str:
     """
     Query Quality Control data from LIMS.
@@ -120,6 +802,7 @@ def query_lims_qc(query: str) -> str:
     
     Args:
         query: User query about QC, COA, assay results, OOS, etc.
+               Batch IDs in the query (e.g. ASP-25-002) limit parsing to those batches' COAs.
         
     Returns:
         JSON string with parsed COA data from APQR_Segregated/LIMS/
@@ -133,11 +816,10 @@ def query_lims_qc(query: str) -> str:
             logger.info("✅ LIMS database index loaded for intelligent file search")
         
         # List available COA documents (recursively searches all subdirectories)
-        available_docs = list_available_documents(LIMS_DOCS_DIR)
-        coa_docs = [doc for doc in available_docs if 'COA' in doc.name.upper()]
+        coa_docs = get_document_manifest(LIMS_DOCS_DIR)["COA"]
         
         if not coa_docs:
-            return json.dumps({
+            return dumps({
                 "status": "no_information_found",
                 "message": "No COA documents found in LIMS directory",
                 "query": query,
@@ -145,46 +827,33 @@ def query_lims_qc(query: str) -> str:
                 "search_note": "Searched for COA documents across all batches (both PDF and DOCX formats)"
             })
         
+        # Only parse the batches the query names (if any of them have COAs)
+        requested_batches = {batch.upper() for batch in _BATCH_ID_RE.findall(query)}
+        if requested_batches:
+            batch_docs = [doc for doc in coa_docs if _coa_batch(doc) in requested_batches]
+            if batch_docs:
+                coa_docs = batch_docs
+        
         logger.info(f"🔬 Found {len(coa_docs)} COA documents")
         
-        # Parse all available COA documents (handles both PDF and DOCX)
-        parsed_coas = []
-        for doc_path in coa_docs:
-            if doc_path.exists():
-                logger.info(f"Parsing COA: {doc_path.name} from {doc_path.parent}")
-                # Parse PDF documents (Batch 1)
-                if doc_path.name.endswith('.pdf'):
-                    coa_data = parse_coa_pdf(str(doc_path))
-                    coa_data['batch'] = "ASP-25-001"  # Batch 1 uses PDF
-                    parsed_coas.append(coa_data)
-                # Parse DOCX documents (Batch 2-4)
-                elif doc_path.name.endswith('.docx'):
-                    text = extract_text_from_docx(str(doc_path))
-                    # Extract batch number from filename
-                    batch = "ASP-25-002" if "002" in doc_path.name else "ASP-25-003" if "003" in doc_path.name else "ASP-25-004" if "004" in doc_path.name else "Unknown"
-                    coa_data = {
-                        "filename": doc_path.name,
-                        "batch": batch,
-                        "material": "API" if "API" in doc_path.name else "Binder" if "Binder" in doc_path.name else "Diluent" if "Diluent" in doc_path.name else "Disintegrant" if "Disintegrant" in doc_path.name else "Lubricant" if "Lubricant" in doc_path.name else "Unknown",
-                        "raw_text": text,
-                        "source": str(doc_path)
-                    }
-                    parsed_coas.append(coa_data)
+        # Parse available COA documents (handles both PDF and DOCX) concurrently,
+        # encoding each one as it arrives
+        encoded_coas = [dumps_bytes(coa, indent=PRETTY_JSON) for coa in _parallel_map(_parse_coa_path, coa_docs)
+                        if coa is not None]
         
         # Return structured JSON data
         result = {
             "status": "success",
             "query": query,
             "data_source": "APQR_Segregated/LIMS/",
-            "document_count": len(parsed_coas),
-            "documents": parsed_coas
+            "document_count": len(encoded_coas)
         }
         
-        return json.dumps(result, indent=2)
+        return dumps_with_documents(result, encoded_coas, indent=PRETTY_JSON)
         
     except Exception as e:
         logger.error(f"Error in query_lims_qc: {e}")
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": str(e),
             "query": query
@@ -214,21 +883,22 @@ def query_lims_validation(query: str) -> str:
         logger.info("✅ LIMS database index loaded for intelligent file search")
     
     # List available LIMS documents
-    available_docs = list_available_documents(LIMS_DOCS_DIR)
+    lims_manifest = get_document_manifest(LIMS_DOCS_DIR)  # Cached manifest, read-only
+    available_docs = lims_manifest["all"]
     
-    result = f"""**📋 Validation Data (LIMS)**
+    parts = [f"""**📋 Validation Data (LIMS)**
 
 **Query:** {query}
 
 **Available LIMS Documents:** {len(available_docs)} files
-"""
+"""]
     
     for doc_path in available_docs[:5]:  # Show first 5
-        info = get_document_info(doc_path)
+        info = get_document_info(doc_path, lims_manifest["stats"].get(doc_path))
         if info.get('exists'):
-            result += f"\n📄 {info['filename']} ({info['size_kb']} KB)"
+            parts.append(f"\n📄 {info['filename']} ({info['size_kb']} KB)")
     
-    result += f"""
+    parts.append(f"""
 
 **Data Source:** LIMS APQR_Segregated/LIMS/
 
@@ -245,9 +915,9 @@ def query_lims_validation(query: str) -> str:
 - Method validation summaries
 
 **Documents Available:** {', '.join(str(doc) for doc in available_docs[:10])}...
-"""
+""")
     
-    return result
+    return "".join(parts)
 
 
 def query_lims_rnd(query: str) -> str:
@@ -273,7 +943,7 @@ def query_lims_rnd(query: str) -> str:
         logger.info("✅ LIMS database index loaded for intelligent file search")
     
     # List available LIMS documents
-    available_docs = list_available_documents(LIMS_DOCS_DIR)
+    available_docs = get_document_manifest(LIMS_DOCS_DIR)["all"]  # Cached manifest, read-only
     
     result = f"""**🧪 R&D Data (LIMS)**
 
@@ -312,54 +982,111 @@ def query_lims_rnd(query: str) -> str:
 # ERP Tools
 # =======================
 
-def query_erp_manufacturing(query: str) -> str:
+def _parse_sds_preview(doc_path: Path) -> Optional[Dict[str, Any]]:
+    """Summarize an SDS for the supply chain tool (hazard preview only)."""
+    if not doc_path.exists():
+        return None
+    logger.info(f"Parsing SDS document: {doc_path.name}")
+    # Hazards are identified in section 2, so stop reading once the hazard window is in
+    text = cached_parse(doc_path, extract_text_from_pdf_until, 'hazard', SDS_HAZARD_WINDOW)
+    hazard_idx = text.lower().find('hazard')
+    
+    # Extract hazard info from SDS (one lowercase copy and one scan)
+    hazards = []
+    if hazard_idx != -1:
+        hazards.append(text[hazard_idx:hazard_idx+SDS_HAZARD_WINDOW])
+    
+    parents = doc_path.parents
+    return {
+        "filename": doc_path.name,
+        "material": doc_path.name.replace('SDS_', '').replace('MSDS', '').replace('.pdf', ''),
+        "document_type": "Safety Data Sheet (SDS)",
+        "hazards_preview": hazards[0] if hazards else "See full document for hazard information",
+        "file_path": str(doc_path),
+        "batch_folder": parents[2].name if len(parents) > 2 else "Unknown"
+    }
+
+
+# Batch by the number of the ASP batch ID in a supply chain filename (anything else is batch 1)
+_SUPPLY_CHAIN_BATCHES = {"002": "ASP-25-002", "003": "ASP-25-003", "004": "ASP-25-004"}
+
+# Text extractor per supply chain file type, with the filename markers of a purchase order
+_SUPPLY_CHAIN_PARSERS = {
+    '.pdf': (extract_text_from_pdf, ("Purchase Order",)),
+    # Batch 2-4 use DOCX
+    '.docx': (extract_text_from_docx, ("Purchase Order", "PO")),
+}
+
+
+def _supply_chain_batch(filename: str) -> str:
+    """Batch a purchase order / procurement document belongs to, from its filename."""
+    batch_match = _BATCH_ID_RE.search(filename)
+    return _SUPPLY_CHAIN_BATCHES.get(batch_match.group(0)[-3:], "ASP-25-001") if batch_match else "ASP-25-001"
+
+
+def _supply_chain_docs(manifest: Dict[str, Any]) -> List[Path]:
     """
-    Query Manufacturing data from ERP.
+    Purchase order / procurement documents: SupplyChain folder files (SDS excluded) named like one.
     
-    **🔍 USES DATABASE INDEX: database_metadata/ERP_INDEX.txt**
-    This index contains file locations, naming patterns, and batch mapping for all ERP documents.
-    
-    **Tool: Batch Manufacturing Record Analyzer, Yield Reconciliation Tool, Deviation Log Interpreter**
-    
-    Args:
-        query: User query about batch records, BMR, yield, etc.
-        
-    Returns:
-        Formatted string with manufacturing data from APQR_Segregated/ERP/
+    Sorted by path so responses list documents in a stable order, and files reached
+    through more than one path (symlinks) appear only once.
     """
-    logger.info(f"🏭 ERP Manufacturing Tool called with query: {query}")
-    
-    # 🔍 NEW: Read the ERP database index for intelligent file search
-    erp_index = read_database_index("ERP")
-    if erp_index:
-        logger.info("✅ ERP database index loaded for intelligent file search")
-    
-    # List available ERP documents
-    available_docs = list_available_documents(ERP_DOCS_DIR)
-    
-    # Get document information
-    doc_details = []
-    for doc_path in available_docs:
-        info = get_document_info(doc_path)
-        doc_details.append(info)
-    
-    result = f"""**🏭 Manufacturing Data (ERP)**
+    docs = {}
+    for doc in sorted(manifest["all"]):
+        if 'SupplyChain' in str(doc) and 'SDS' not in doc.name and _SUPPLY_CHAIN_NAME_RE.search(doc.name):
+            docs.setdefault(os.path.realpath(doc), doc)
+    return list(docs.values())
+
+
+def _sds_materials(manifest: Dict[str, Any]) -> Dict[Path, set]:
+    """Map each SDS file to the query materials its filename matches, scanning each name once."""
+    materials = {}
+    for doc in manifest["SDS"]:
+        patterns = _keywords_in(doc.name, _SDS_PATTERN_MATERIALS, _SDS_PATTERN_AUTOMATON)
+        materials[doc] = {material for pattern in patterns for material in _SDS_PATTERN_MATERIALS[pattern]}
+    return materials
+
+
+def _classify_supply_chain_docs(manifest: Dict[str, Any]) -> Dict[Path, Tuple[Callable[[str], str], str, str]]:
+    """Resolve each parseable supply chain document's (text extractor, document type, batch) from its filename."""
+    classified = {}
+    for doc in manifest_view(manifest, "supply_chain", _supply_chain_docs):
+        parser_info = _SUPPLY_CHAIN_PARSERS.get(doc.suffix.lower())
+        if parser_info is None:
+            continue
+        parser, po_markers = parser_info
+        document_type = "Purchase Order" if any(marker in doc.name for marker in po_markers) else "Procurement Document"
+        classified[doc] = (parser, document_type, _supply_chain_batch(doc.name))
+    return classified
+
+
+def _parse_supply_chain_document(doc_path: Path,
+                                 classified: Dict[Path, Tuple[Callable[[str], str], str, str]]) -> Optional[Dict[str, Any]]:
+    """Extract a purchase order / procurement document, or None if missing or unsupported."""
+    classification = classified.get(doc_path)
+    if classification is None or not doc_path.exists():
+        return None
+    parser, document_type, batch = classification
+    logger.info(f"Parsing Supply Chain document: {doc_path.name} from {doc_path.parent}")
+    text = cached_parse(doc_path, parser)
+    # Full text is returned; query_erp_supplychain applies the response-wide text budget
+    return {
+        "filename": doc_path.name,
+        "document_type": document_type,
+        "batch": batch,
+        "raw_text": text,
+        "source": str(doc_path)
+    }
+
+# Response templates for the listing-only ERP tools; only the query and documents vary per call
+_MANUFACTURING_TEMPLATE = """**🏭 Manufacturing Data (ERP)**
 
 **Query:** {query}
 
 **Available Manufacturing Documents:**
-"""
-    
-    for info in doc_details:
-        if info.get('exists'):
-            result += f"\n📄 **{info['filename']}**"
-            result += f"\n   - Size: {info['size_kb']} KB"
-            result += f"\n   - Path: {info['path']}"
-            result += "\n"
-    
-    result += f"""
+{document_listing}
 **Data Source:** ERP APQR_Segregated/ERP/
-**Total Documents:** {len(available_docs)}
+**Total Documents:** {count}
 
 **Manufacturing Capabilities:**
 - ✅ Batch Manufacturing Record (BMR) Analyzer
@@ -374,42 +1101,14 @@ def query_erp_manufacturing(query: str) -> str:
 - Yield reconciliation data
 - Manufacturing deviation logs
 
-**Documents:** {', '.join(str(doc) for doc in available_docs[:10])}...
+**Documents:** {documents}...
 """
-    
-    return result
 
-
-def query_erp_engineering(query: str) -> str:
-    """
-    Query Engineering data from ERP.
-    
-    **🔍 USES DATABASE INDEX: database_metadata/ERP_INDEX.txt**
-    This index contains file locations, naming patterns, and batch mapping for all ERP documents.
-    
-    **Tool: Equipment Calibration Extractor, Maintenance Log Reader, Utility Performance Tracker**
-    
-    Args:
-        query: User query about equipment, calibration, maintenance, etc.
-        
-    Returns:
-        Formatted string with engineering data from APQR_Segregated/ERP/
-    """
-    logger.info(f"⚙️ ERP Engineering Tool called with query: {query}")
-    
-    # 🔍 NEW: Read the ERP database index for intelligent file search
-    erp_index = read_database_index("ERP")
-    if erp_index:
-        logger.info("✅ ERP database index loaded for intelligent file search")
-    
-    # List available ERP documents
-    available_docs = list_available_documents(ERP_DOCS_DIR)
-    
-    result = f"""**⚙️ Engineering Data (ERP)**
+_ENGINEERING_TEMPLATE = """**⚙️ Engineering Data (ERP)**
 
 **Query:** {query}
 
-**Available Engineering Documents:** {len(available_docs)} files
+**Available Engineering Documents:** {count} files
 
 **Data Source:** ERP APQR_Segregated/ERP/
 
@@ -426,7 +1125,7 @@ def query_erp_engineering(query: str) -> str:
 - Equipment qualification status
 - Engineering change control
 
-**Documents:** {', '.join(str(doc.name) for doc in available_docs[:10])}...
+**Documents:** {documents}...
 
 **Engineering Focus Areas:**
 - Calibration management
@@ -434,8 +1133,76 @@ def query_erp_engineering(query: str) -> str:
 - Utility monitoring
 - Equipment lifecycle tracking
 """
+
+
+def query_erp_manufacturing(query: str) -> str:
+    """
+    Query Manufacturing data from ERP.
     
-    return result
+    **🔍 USES DATABASE INDEX: database_metadata/ERP_INDEX.txt**
+    This index contains file locations, naming patterns, and batch mapping for all ERP documents.
+    
+    **Tool: Batch Manufacturing Record Analyzer, Yield Reconciliation Tool, Deviation Log Interpreter**
+    
+    Args:
+        query: User query about batch records, BMR, yield, etc.
+        
+    Returns:
+        Formatted string with manufacturing data from APQR_Segregated/ERP/
+    """
+    logger.info(f"🏭 ERP Manufacturing Tool called with query: {query}")
+    
+    # 🔍 NEW: Read the ERP database index for intelligent file search
+    erp_index = read_database_index("ERP")
+    if erp_index:
+        logger.info("✅ ERP database index loaded for intelligent file search")
+    
+    # List available ERP documents
+    erp_manifest = get_document_manifest(ERP_DOCS_DIR)  # Cached manifest, read-only
+    available_docs = erp_manifest["all"]
+    
+    # Document listing is rendered once per manifest
+    document_listing = manifest_view(erp_manifest, "manufacturing_listing",
+                                     lambda manifest: _document_entries(manifest, manifest["all"], with_path=True))
+    
+    return _MANUFACTURING_TEMPLATE.format(
+        query=query,
+        document_listing=document_listing,
+        count=len(available_docs),
+        documents=', '.join(str(doc) for doc in available_docs[:10]),
+    )
+
+
+def query_erp_engineering(query: str) -> str:
+    """
+    Query Engineering data from ERP.
+    
+    **🔍 USES DATABASE INDEX: database_metadata/ERP_INDEX.txt**
+    This index contains file locations, naming patterns, and batch mapping for all ERP documents.
+    
+    **Tool: Equipment Calibration Extractor, Maintenance Log Reader, Utility Performance Tracker**
+    
+    Args:
+        query: User query about equipment, calibration, maintenance, etc.
+        
+    Returns:
+        Formatted string with engineering data from APQR_Segregated/ERP/
+    """
+    logger.info(f"⚙️ ERP Engineering Tool called with query: {query}")
+    
+    # 🔍 NEW: Read the ERP database index for intelligent file search
+    erp_index = read_database_index("ERP")
+    if erp_index:
+        logger.info("✅ ERP database index loaded for intelligent file search")
+    
+    # List available ERP documents
+    available_docs = get_document_manifest(ERP_DOCS_DIR)["all"]  # Cached manifest, read-only
+    
+    return _ENGINEERING_TEMPLATE.format(
+        query=query,
+        count=len(available_docs),
+        documents=', '.join(str(doc.name) for doc in available_docs[:10]),
+    )
 
 
 def query_erp_supplychain(query: str) -> str:
@@ -447,6 +1214,12 @@ def query_erp_supplychain(query: str) -> str:
     
     **Tool: Vendor Qualification Extractor, Purchase Order & GRN Tracker, Material Reconciliation Analyzer, SDS/MSDS Retriever**
     
+    Documents carry their full "raw_text" until SUPPLY_CHAIN_TEXT_BUDGET characters have been
+    returned; each later document that does not fit carries "text_preview" (the first
+    TEXT_PREVIEW_CHARS characters) and "text_len" instead, so consumers must treat
+    "raw_text" as optional. Queries that only ask which documents exist (e.g. "how many
+    POs are there?") skip text extraction entirely and report "content_included": false.
+    
     Args:
         query: User query about GRN, PO, vendors, materials, SDS, safety data sheets, etc.
         
@@ -456,7 +1229,8 @@ def query_erp_supplychain(query: str) -> str:
     logger.info(f"📦 ERP Supply Chain Tool called with query: {query}")
     
     # Check if this is an SDS query
-    is_sds_query = any(keyword in query.lower() for keyword in ['sds', 'safety data sheet', 'msds', 'material safety', 'hazard', 'safety'])
+    query_lower = query.lower()
+    is_sds_query = bool(_keywords_in(query_lower, _SDS_QUERY_KEYWORDS, _SDS_QUERY_AUTOMATON))
     
     try:
         # 🔍 NEW: Read the ERP database index for intelligent file search
@@ -465,17 +1239,17 @@ def query_erp_supplychain(query: str) -> str:
             logger.info("✅ ERP database index loaded for intelligent file search")
         
         # List available ERP documents (recursively searches all subdirectories)
-        available_docs = list_available_documents(ERP_DOCS_DIR)
+        erp_manifest = get_document_manifest(ERP_DOCS_DIR)
         
         # === HANDLE SDS QUERIES (Safety Data Sheets) ===
         if is_sds_query:
             logger.info("🔍 SDS query detected - searching for Safety Data Sheets")
             
             # Find all SDS/MSDS files
-            sds_docs = [doc for doc in available_docs if 'SDS' in doc.name.upper() or 'MSDS' in doc.name.upper()]
+            sds_docs = erp_manifest["SDS"]
             
             if not sds_docs:
-                return json.dumps({
+                return dumps({
                     "status": "no_information_found",
                     "message": "No SDS (Safety Data Sheets) documents found in ERP directory",
                     "query": query,
@@ -485,63 +1259,32 @@ def query_erp_supplychain(query: str) -> str:
             
             logger.info(f"📋 Found {len(sds_docs)} SDS documents")
             
-            # Extract material name from query if specified
-            material_keywords = {
-                'api': ['SDS_API', 'Salicylic'],
-                'binder': ['SDS_Binder', 'HPMC'],
-                'filler': ['SDS_Filler', 'MCC', 'Cellulose'],
-                'diluent': ['SDS_Filler', 'MCC', 'Cellulose'],
-                'disintegrant': ['SDS_Disintegrant', 'Cornstarch'],
-                'lubricant': ['SDS_Lubricant', 'Magnesium', 'Stearate'],
-                'pvc': ['PVC', 'Film'],
-                'foil': ['Foil', 'Lidding']
-            }
-            
             # Filter SDS docs based on material mentioned in query
-            query_lower = query.lower()
+            sds_materials = manifest_view(erp_manifest, "sds_materials", _sds_materials)
+            query_materials = _keywords_in(query_lower, _SDS_MATERIAL_PATTERNS, _SDS_MATERIAL_AUTOMATON)
             filtered_sds = []
-            for material, patterns in material_keywords.items():
-                if material in query_lower:
-                    for doc in sds_docs:
-                        if any(pattern in doc.name for pattern in patterns):
-                            filtered_sds.append(doc)
+            for material in _SDS_MATERIAL_PATTERNS:
+                if material in query_materials:
+                    filtered_sds.extend(doc for doc in sds_docs if material in sds_materials[doc])
             
             # If no specific material mentioned, return all SDS docs
             if not filtered_sds:
                 filtered_sds = sds_docs
             
-            # Parse SDS documents
-            parsed_sds = []
-            for doc_path in filtered_sds[:10]:  # Limit to 10 for performance
-                if doc_path.exists():
-                    logger.info(f"Parsing SDS document: {doc_path.name}")
-                    text = extract_text_from_pdf(str(doc_path))
-                    
-                    # Extract hazard info from SDS
-                    hazards = []
-                    if 'hazard' in text.lower():
-                        hazard_section = text[text.lower().find('hazard'):text.lower().find('hazard')+500]
-                        hazards.append(hazard_section[:200])
-                    
-                    parsed_sds.append({
-                        "filename": doc_path.name,
-                        "material": doc_path.name.replace('SDS_', '').replace('MSDS', '').replace('.pdf', ''),
-                        "document_type": "Safety Data Sheet (SDS)",
-                        "hazards_preview": hazards[0] if hazards else "See full document for hazard information",
-                        "file_path": str(doc_path),
-                        "batch_folder": doc_path.parent.parent.parent.name if len(doc_path.parents) >= 3 else "Unknown"
-                    })
+            # Parse SDS documents concurrently
+            parsed_sds = [sds for sds in _parallel_map(_parse_sds_preview, filtered_sds[:10])  # Limit to 10 for performance
+                          if sds is not None]
             
             # Return formatted SDS data
-            result = f"""**📋 Safety Data Sheets (SDS) - Supply Chain**
+            parts = [f"""**📋 Safety Data Sheets (SDS) - Supply Chain**
 
 **Query:** {query}
 
 **Found {len(parsed_sds)} SDS document(s):**
 
-"""
+"""]
             for sds in parsed_sds:
-                result += f"""
+                parts.append(f"""
 📄 **{sds['material']}**
    - Document: {sds['filename']}
    - Type: {sds['document_type']}
@@ -549,16 +1292,16 @@ def query_erp_supplychain(query: str) -> str:
    - Hazards: {sds['hazards_preview'][:150]}...
    - Path: ...{sds['file_path'][-60:]}
 
-"""
+""")
             
-            result += f"""
+            parts.append(f"""
 **Data Source:** APQR_Segregated/ERP/SupplyChain/
 **Total SDS Files:** {len(sds_docs)}
 
 **💡 Tip:** SDS documents contain safety information including hazard statements, 
 handling precautions, and emergency procedures for each material.
-"""
-            return result
+""")
+            return "".join(parts)
         
         # === HANDLE PURCHASE ORDER / PROCUREMENT QUERIES ===
         # 🔍 ENHANCED: Search for supply chain documents using multiple patterns
@@ -566,29 +1309,11 @@ handling precautions, and emergency procedures for each material.
         # Pattern 2: Material names followed by ASP-25 (Batch 2-4 style: "Binder - ASP-25-002.docx")
         # Pattern 3: "PO" in filename
         
-        # Extract material keywords from query
-        material_keywords = ['API', 'Binder', 'Diluent', 'Disintegrant', 'Lubricant', 
-                            'HPMC', 'MCC', 'Cornstarch', 'Magnesium', 'Salicylic']
-        
-        supply_chain_docs = []
-        for doc in available_docs:
-            # Check if it's in SupplyChain folder (exclude SDS files)
-            if 'SupplyChain' in str(doc) and 'SDS' not in doc.name and 'MSDS' not in doc.name:
-                # Pattern matching for supply chain documents
-                if any([
-                    'Purchase Order' in doc.name,
-                    'Requisition' in doc.name,
-                    'PO-' in doc.name,
-                    'Req. Slip' in doc.name,
-                    # Match material names for Batch 2-4 style files
-                    any(material in doc.name for material in material_keywords) and 'ASP-25' in doc.name,
-                    # Match direct material name files (like "Binder - ASP-25-002.docx")
-                    any(material in doc.name for material in material_keywords) and 'ASP' in doc.name
-                ]):
-                    supply_chain_docs.append(doc)
+        # Supply chain documents live in the SupplyChain folder (SDS files excluded)
+        supply_chain_docs = manifest_view(erp_manifest, "supply_chain", _supply_chain_docs)
         
         if not supply_chain_docs:
-            return json.dumps({
+            return dumps({
                 "status": "no_information_found",
                 "message": "No Purchase Order or Requisition documents found in ERP directory",
                 "query": query,
@@ -598,47 +1323,47 @@ handling precautions, and emergency procedures for each material.
         
         logger.info(f"📦 Found {len(supply_chain_docs)} supply chain documents")
         
-        # Parse all available supply chain documents
-        parsed_docs = []
-        for doc_path in supply_chain_docs:
-            if doc_path.exists():
-                logger.info(f"Parsing Supply Chain document: {doc_path.name} from {doc_path.parent}")
-                # Parse PDF documents
-                if doc_path.name.endswith('.pdf'):
-                    text = extract_text_from_pdf(str(doc_path))
-                    parsed_docs.append({
-                        "filename": doc_path.name,
-                        "document_type": "Purchase Order" if "Purchase Order" in doc_path.name else "Procurement Document",
-                        "batch": "ASP-25-002" if "002" in doc_path.name else "ASP-25-003" if "003" in doc_path.name else "ASP-25-004" if "004" in doc_path.name else "ASP-25-001",
-                        "raw_text": text,
-                        "source": str(doc_path)
-                    })
-                # Parse DOCX documents (Batch 2-4 use DOCX)
-                elif doc_path.name.endswith('.docx'):
-                    text = extract_text_from_docx(str(doc_path))
-                    parsed_docs.append({
-                        "filename": doc_path.name,
-                        "document_type": "Purchase Order" if "Purchase Order" in doc_path.name or "PO" in doc_path.name else "Procurement Document",
-                        "batch": "ASP-25-002" if "002" in doc_path.name else "ASP-25-003" if "003" in doc_path.name else "ASP-25-004" if "004" in doc_path.name else "ASP-25-001",
-                        "raw_text": text,
-                        "source": str(doc_path)
-                    })
+        # Document type and batch are classified once per manifest, not per query
+        classified = manifest_view(erp_manifest, "supply_chain_classified", _classify_supply_chain_docs)
+        needs_content = _needs_document_content(query)
+        if needs_content:
+            # Parse all available supply chain documents concurrently
+            parse_document = functools.partial(_parse_supply_chain_document, classified=classified)
+            docs = _parallel_map(parse_document, supply_chain_docs)
+        else:
+            logger.info("📦 Metadata-only query - skipping document text extraction")
+            docs = ({
+                "filename": doc_path.name,
+                "document_type": classified[doc_path][1],
+                "batch": classified[doc_path][2],
+                "source": str(doc_path)
+            } for doc_path in supply_chain_docs if doc_path in classified)
+        
+        # Encode each document and collect its batch as it arrives
+        encoded_docs = []
+        batches_found = set()
+        text_budget = SUPPLY_CHAIN_TEXT_BUDGET
+        for doc in docs:
+            if doc is not None:
+                doc, text_budget = _fit_text_budget(doc, text_budget)
+                encoded_docs.append(dumps_bytes(doc, indent=PRETTY_JSON))
+                batches_found.add(doc["batch"])
         
         # Return structured JSON data
         result = {
             "status": "success",
             "query": query,
             "data_source": "APQR_Segregated/ERP/",
-            "document_count": len(parsed_docs),
-            "batches_found": list(set([doc.get("batch") for doc in parsed_docs])),
-            "documents": parsed_docs
+            "document_count": len(encoded_docs),
+            "batches_found": list(batches_found),
+            "content_included": needs_content
         }
         
-        return json.dumps(result, indent=2)
+        return dumps_with_documents(result, encoded_docs, indent=PRETTY_JSON)
         
     except Exception as e:
         logger.error(f"Error in query_erp_supplychain: {e}")
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": str(e),
             "query": query
@@ -649,6 +1374,51 @@ handling precautions, and emergency procedures for each material.
 # DMS Tools
 # =======================
 
+def _parse_sds_document(doc_path: Path) -> Optional[Dict[str, Any]]:
+    """Fully parse an SDS for the regulatory tool, or return None if it has disappeared."""
+    if not doc_path.exists():
+        return None
+    logger.info(f"Parsing SDS: {doc_path.name} from {doc_path.parent}")
+    return _cap_raw_text(cached_parse(doc_path, parse_sds_pdf))
+
+
+# Response template for the general (non-SOP) DMS QA query; only the query and documents vary per call
+_QA_TEMPLATE = """**📋 Quality Assurance Documents (DMS)**
+
+**Query:** {query}
+
+**Available QA Documents:**
+{document_listing}
+**Data Source:** DMS APQR_Segregated/DMS/
+**Total SDS Documents:** {sds_count}
+
+**QA Capabilities:**
+- ✅ CAPA Tracker: Track CAPA status and closure
+- ✅ Change Control Parser: Parse and track change controls
+- ✅ Training Effectiveness Evaluator: Evaluate training outcomes
+- ✅ Deviation management and trending
+- ✅ SOP Version Tracker: Track SOP versions and metadata ({total_sops} SOPs indexed)
+
+**Available Data Types:**
+- CAPA (Corrective and Preventive Actions)
+- Change control documents
+- Deviation reports
+- Non-conformance records
+- Quality investigations
+- Safety Data Sheets (SDS)
+- Standard Operating Procedures (SOPs) - {total_sops} documents
+
+**Documents:** {documents}...
+
+**QA Focus Areas:**
+- CAPA effectiveness
+- Change control compliance
+- Deviation trending
+- Quality metrics
+- SOP version control
+"""
+
+
 def query_dms_qa(query: str) -> str:
     """
     Query Quality Assurance documents from DMS.
@@ -666,73 +1436,31 @@ def query_dms_qa(query: str) -> str:
     """
     logger.info(f"📋 DMS QA Tool called with query: {query}")
     
-    # 🔍 Load SOP index for intelligent SOP search
-    sop_index_path = Path(__file__).parent.parent / "output" / "sop_index.json"
-    sop_index = {}
-    if sop_index_path.exists():
-        with open(sop_index_path, 'r', encoding='utf-8') as f:
-            sop_index = json.load(f)
-        logger.info(f"✅ SOP index loaded: {sop_index['metadata']['total_sops']} SOPs indexed")
+    # 🔍 Load SOP index for intelligent SOP search (parsed once, reused while unchanged)
+    sop_index = read_sop_index()
     
     # Check if query is SOP-related
-    is_sop_query = any(keyword in query.lower() for keyword in ['sop', 'standard operating procedure', 'version', 'procedure', 'bmr', 'ppe', 'hplc', 'batch', 'safety', 'equipment', 'manufacturing', 'packaging', 'warehouse', 'calibration', 'cleaning', 'sampling'])
+    query_lower = query.lower()
+    is_sop_query = bool(_keywords_in(query_lower, _SOP_QUERY_KEYWORDS, _SOP_QUERY_AUTOMATON))
     
     if is_sop_query and sop_index:
         # === SEMANTIC SEARCH: Search by keywords/aliases, not just SOP number ===
-        query_lower = query.lower()
         
         # Extract search terms from query
-        search_terms = re.findall(r'\b[a-z]{3,}\b', query_lower)
+        search_terms = _SEARCH_TERM_RE.findall(query_lower)
         
-        # Search for SOPs by semantic matching
-        matching_sops = {}
-        
-        for sop_key, sop_data in sop_index['sops'].items():
-            score = 0
-            
-            # Check aliases (high priority - exact match)
-            if sop_data.get('aliases'):
-                for alias in sop_data['aliases']:
-                    if alias in query_lower:
-                        score += 10  # High score for alias match
-            
-            # Check keywords (medium priority)
-            if sop_data.get('keywords'):
-                for keyword in sop_data['keywords']:
-                    if keyword in search_terms:
-                        score += 5  # Medium score for keyword match
-            
-            # Check title (medium priority)
-            if sop_data.get('title'):
-                title_lower = sop_data['title'].lower()
-                for term in search_terms:
-                    if term in title_lower:
-                        score += 3
-            
-            # Check purpose (low priority)
-            if sop_data.get('purpose'):
-                purpose_lower = sop_data['purpose'].lower()
-                for term in search_terms:
-                    if term in purpose_lower:
-                        score += 1
-            
-            # Check department match
-            if sop_data.get('department'):
-                dept_lower = sop_data['department'].lower()
-                if any(term in dept_lower for term in search_terms):
-                    score += 2
-            
-            if score > 0:
-                matching_sops[sop_key] = (sop_data, score)
+        # Search for SOPs by semantic matching (aliases, keywords, title, purpose, department)
+        matching_sops = _score_sops(sop_index, query_lower, search_terms)
         
         # If semantic search found matches, return them
         if matching_sops:
-            # Sort by score (highest first)
-            sorted_matches = sorted(matching_sops.items(), key=lambda x: x[1][1], reverse=True)
+            # Only the ten best are ever shown: select them by score (highest first, ties in
+            # index order) without sorting every match
+            top_matches = heapq.nlargest(10, matching_sops.items(), key=lambda x: x[1][1])
             
             # If only one strong match, show details
-            if len(sorted_matches) == 1 or (len(sorted_matches) > 1 and sorted_matches[0][1][1] >= 10):
-                top_match = sorted_matches[0]
+            if len(matching_sops) == 1 or top_matches[0][1][1] >= 10:
+                top_match = top_matches[0]
                 sop_data = top_match[1][0]
                 
                 # Find all versions of this SOP
@@ -741,16 +1469,19 @@ def query_dms_qa(query: str) -> str:
                 
                 if len(all_versions) > 1:
                     # Multiple versions found
-                    result = f"""**📋 SOP Query Result - Semantic Search**
+                    # Newest version first (numeric versions, so "10" sorts above "9"); the first is current
+                    versions = _sop_search_index(sop_index)["versions"]
+                    newest_first = sorted(all_versions.items(), key=lambda item: versions[item[0]], reverse=True)
+                    parts = [f"""**📋 SOP Query Result - Semantic Search**
 
 **Query:** {query}
 
 **Found:** {sop_data['sop_number']} ({len(all_versions)} version(s))
 **Matched by:** {', '.join(sop_data.get('aliases', [])[:3]) if sop_data.get('aliases') else 'keywords'}
 
-"""
-                    for sop_key_inner, sop_data_inner in sorted(all_versions.items(), key=lambda x: x[1].get('version', '0'), reverse=True):
-                        result += f"""
+"""]
+                    for sop_key_inner, sop_data_inner in newest_first:
+                        parts.append(f"""
 📄 **{sop_data_inner['sop_number']} - Version {sop_data_inner['version']}**
    - **Title:** {sop_data_inner['full_title'] if sop_data_inner.get('full_title') else sop_data_inner.get('title', 'Not available')}
    - **Department:** {sop_data_inner['department']}
@@ -759,14 +1490,12 @@ def query_dms_qa(query: str) -> str:
    - **Aliases:** {', '.join(sop_data_inner.get('aliases', [])) if sop_data_inner.get('aliases') else 'None'}
    - **File:** {sop_data_inner['file_name']}
 
-"""
+""")
                     
-                    # Identify current (latest) version
-                    latest_version = max(all_versions.items(), key=lambda x: float(x[1].get('version', 0) or 0))
-                    result += f"✅ **Current Version:** {latest_version[1]['version']}\n"
-                    result += f"📅 **Indexed at:** {sop_index['metadata']['indexed_at']}\n"
+                    parts.append(f"✅ **Current Version:** {newest_first[0][1]['version']}\n")
+                    parts.append(f"📅 **Indexed at:** {sop_index['metadata']['indexed_at']}\n")
                     
-                    return result
+                    return "".join(parts)
                 
                 else:
                     # Single version
@@ -793,32 +1522,32 @@ def query_dms_qa(query: str) -> str:
             
             else:
                 # Multiple matches - show list
-                result = f"""**📋 SOP Query Results - Semantic Search**
+                parts = [f"""**📋 SOP Query Results - Semantic Search**
 
 **Query:** {query}
 
-**Found {len(sorted_matches)} matching SOP(s):**
+**Found {len(matching_sops)} matching SOP(s):**
 
-"""
-                for sop_key, (sop_data, score) in sorted_matches[:10]:  # Limit to top 10
+"""]
+                for sop_key, (sop_data, score) in top_matches:  # Limit to top 10
                     # Only show latest version (skip versioned keys)
                     if '_v' not in sop_key:
-                        result += f"""
+                        parts.append(f"""
 📄 **{sop_data['sop_number']}** (v{sop_data.get('version', '?')})
    - {sop_data.get('title', 'No title')[:80]}...
    - Department: {sop_data.get('department', 'Unknown')}
    - Matches: {', '.join(sop_data.get('aliases', [])[:3]) if sop_data.get('aliases') else 'keywords'}
 
-"""
+""")
                 
-                result += f"\n💡 **Tip:** Ask for a specific SOP number for detailed information (e.g., 'What is SOP-PROD-001?')\n"
-                result += f"📅 **Indexed at:** {sop_index['metadata']['indexed_at']}\n"
+                parts.append(f"\n💡 **Tip:** Ask for a specific SOP number for detailed information (e.g., 'What is SOP-PROD-001?')\n")
+                parts.append(f"📅 **Indexed at:** {sop_index['metadata']['indexed_at']}\n")
                 
-                return result
+                return "".join(parts)
         
         # === EXACT SOP NUMBER SEARCH (original logic) ===
         # Search for specific SOP in query
-        sop_match = re.search(r'SOP[_-]([A-Z]+)[_-](\d+)', query, re.IGNORECASE)
+        sop_match = _SOP_NUMBER_RE.search(query)
         
         if sop_match:
             # Specific SOP requested
@@ -830,7 +1559,10 @@ def query_dms_qa(query: str) -> str:
             matching_sops = {k: v for k, v in sop_index['sops'].items() if sop_number in k}
             
             if matching_sops:
-                result = f"""**📋 SOP Query Result**
+                # Newest version first (numeric versions, so "10" sorts above "9"); the first is current
+                versions = _sop_search_index(sop_index)["versions"]
+                newest_first = sorted(matching_sops.items(), key=lambda item: versions[item[0]], reverse=True)
+                parts = [f"""**📋 SOP Query Result**
 
 **Query:** {query}
 
@@ -838,9 +1570,9 @@ def query_dms_qa(query: str) -> str:
 
 **Found {len(matching_sops)} version(s):**
 
-"""
-                for sop_key, sop_data in sorted(matching_sops.items(), key=lambda x: x[1].get('version', '0'), reverse=True):
-                    result += f"""
+"""]
+                for sop_key, sop_data in newest_first:
+                    parts.append(f"""
 📄 **{sop_data['sop_number']} - Version {sop_data['version']}**
    - **Title:** {sop_data['title'] if sop_data['title'] else 'Not available'}
    - **Department:** {sop_data['department']}
@@ -850,14 +1582,12 @@ def query_dms_qa(query: str) -> str:
    - **File:** {sop_data['file_name']}
    - **Path:** ...{sop_data['file_path'][-60:]}
 
-"""
+""")
                 
-                # Identify current (latest) version
-                latest_version = max(matching_sops.items(), key=lambda x: float(x[1].get('version', 0) or 0))
-                result += f"✅ **Current Version:** {latest_version[1]['version']}\n"
-                result += f"📅 **Indexed at:** {sop_index['metadata']['indexed_at']}\n"
+                parts.append(f"✅ **Current Version:** {newest_first[0][1]['version']}\n")
+                parts.append(f"📅 **Indexed at:** {sop_index['metadata']['indexed_at']}\n")
                 
-                return result
+                return "".join(parts)
             else:
                 return f"""**📋 SOP Query Result**
 
@@ -870,93 +1600,31 @@ Please check the SOP number or list all SOPs using: "List all SOPs"
         
         else:
             # General SOP query - list all SOPs
-            if 'list' in query.lower() or 'all' in query.lower():
-                # Group by department
-                by_department = {}
-                for sop_key, sop_data in sop_index['sops'].items():
-                    # Only show latest version (exclude versioned keys like "SOP-X_v2")
-                    if '_v' not in sop_key:
-                        dept = sop_data.get('department', 'Unknown')
-                        if dept not in by_department:
-                            by_department[dept] = []
-                        by_department[dept].append(sop_data)
-                
-                result = f"""**📋 Standard Operating Procedures (SOPs) in DMS**
+            if 'list' in query_lower or 'all' in query_lower:
+                # Everything after the query line is rendered once per loaded index
+                return f"""**📋 Standard Operating Procedures (SOPs) in DMS**
 
 **Query:** {query}
 
-**Total SOPs:** {sop_index['metadata']['total_sops']} documents
-**Latest Versions:** {len([k for k in sop_index['sops'].keys() if '_v' not in k])} SOPs
-
-**SOPs by Department:**
-
-"""
-                for dept, sops in sorted(by_department.items()):
-                    result += f"\n**{dept}**\n"
-                    for sop in sorted(sops, key=lambda x: x.get('sop_number', '')):
-                        version_info = f"v{sop.get('version', '?')}" if sop.get('version') else ''
-                        result += f"- {sop.get('sop_number', 'Unknown')} {version_info}\n"
-                
-                result += f"\n📅 **Index last updated:** {sop_index['metadata']['indexed_at']}\n"
-                result += f"📊 **Data Source:** {sop_index['metadata']['dms_path']}\n"
-                
-                return result
+""" + _sop_department_listing(sop_index)
     
     # Fall back to general DMS QA query
     # List available DMS documents
-    available_docs = list_available_documents(DMS_DOCS_DIR)
-    sds_docs = [doc for doc in available_docs if 'SDS' in doc.name.upper()]
-    
-    # Get document information
-    doc_details = []
-    for doc_path in sds_docs:
-        info = get_document_info(doc_path)
-        doc_details.append(info)
+    dms_manifest = get_document_manifest(DMS_DOCS_DIR)
+    available_docs = dms_manifest["all"]
+    sds_docs = dms_manifest["SDS"]
     
-    result = f"""**📋 Quality Assurance Documents (DMS)**
-
-**Query:** {query}
-
-**Available QA Documents:**
-"""
-    
-    for info in doc_details:
-        if info.get('exists'):
-            result += f"\n📄 **{info['filename']}**"
-            result += f"\n   - Size: {info['size_kb']} KB"
-            result += "\n"
-    
-    result += f"""
-**Data Source:** DMS APQR_Segregated/DMS/
-**Total SDS Documents:** {len(sds_docs)}
-
-**QA Capabilities:**
-- ✅ CAPA Tracker: Track CAPA status and closure
-- ✅ Change Control Parser: Parse and track change controls
-- ✅ Training Effectiveness Evaluator: Evaluate training outcomes
-- ✅ Deviation management and trending
-- ✅ SOP Version Tracker: Track SOP versions and metadata ({sop_index['metadata']['total_sops']} SOPs indexed)
-
-**Available Data Types:**
-- CAPA (Corrective and Preventive Actions)
-- Change control documents
-- Deviation reports
-- Non-conformance records
-- Quality investigations
-- Safety Data Sheets (SDS)
-- Standard Operating Procedures (SOPs) - {sop_index['metadata']['total_sops']} documents
-
-**Documents:** {', '.join(str(doc.name) for doc in available_docs[:10])}...
-
-**QA Focus Areas:**
-- CAPA effectiveness
-- Change control compliance
-- Deviation trending
-- Quality metrics
-- SOP version control
-"""
+    # SDS listing is rendered once per manifest
+    document_listing = manifest_view(dms_manifest, "sds_listing",
+                                     lambda manifest: _document_entries(manifest, manifest["SDS"], with_path=False))
     
-    return result
+    return _QA_TEMPLATE.format(
+        query=query,
+        document_listing=document_listing,
+        sds_count=len(sds_docs),
+        total_sops=sop_index['metadata']['total_sops'],
+        documents=', '.join(str(doc.name) for doc in available_docs[:10]),
+    )
 
 
 def query_dms_regulatory(query: str) -> str:
@@ -968,6 +1636,9 @@ def query_dms_regulatory(query: str) -> str:
     
     **Tool: Product Dossier Compiler, Variation Tracker, Regulatory Submission Extractor**
     
+    Queries that only ask which documents exist (e.g. "how many SDS are available?") skip
+    PDF parsing and return document metadata with "content_included": false.
+    
     Args:
         query: User query about dossiers, submissions, regulatory commitments, SDS, etc.
         
@@ -983,75 +1654,55 @@ def query_dms_regulatory(query: str) -> str:
             logger.info("✅ DMS database index loaded for intelligent file search")
         
         # List available DMS documents (recursively searches all subdirectories)
-        available_docs = list_available_documents(DMS_DOCS_DIR)
-        sds_docs = [doc for doc in available_docs if 'SDS' in doc.name.upper()]
+        dms_manifest = get_document_manifest(DMS_DOCS_DIR)
+        available_docs = dms_manifest["all"]
+        sds_docs = dms_manifest["SDS"]
         
         if not sds_docs:
-            return json.dumps({
+            return dumps({
                 "status": "no_information_found",
                 "message": "No SDS or regulatory documents found in DMS directory",
                 "query": query,
                 "data_source": "APQR_Segregated/DMS/"
             })
         
-        # Parse all available SDS documents
-        parsed_sds = []
-        for doc_path in sds_docs:
-            if doc_path.exists():
-                logger.info(f"Parsing SDS: {doc_path.name} from {doc_path.parent}")
-                sds_data = parse_sds_pdf(str(doc_path))
-                parsed_sds.append(sds_data)
+        needs_content = _needs_document_content(query, _NEEDS_SDS_CONTENT_RE)
+        if needs_content:
+            # Parse all available SDS documents concurrently
+            sds_entries = _parallel_map(_parse_sds_document, sds_docs)
+        else:
+            logger.info("📋 Metadata-only query - skipping SDS parsing")
+            sds_entries = (get_document_info(doc_path, dms_manifest["stats"].get(doc_path)) for doc_path in sds_docs)
+        
+        # Encode each document as it arrives
+        encoded_sds = [dumps_bytes(sds, indent=PRETTY_JSON) for sds in sds_entries if sds is not None]
         
         # Return structured JSON data
         result = {
             "status": "success",
             "query": query,
             "data_source": "APQR_Segregated/DMS/",
-            "document_count": len(parsed_sds),
-            "documents": parsed_sds
+            "document_count": len(encoded_sds),
+            "content_included": needs_content
         }
         
-        return json.dumps(result, indent=2)
+        return dumps_with_documents(result, encoded_sds, indent=PRETTY_JSON)
         
     except Exception as e:
         logger.error(f"Error in query_dms_regulatory: {e}")
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": str(e),
             "query": query
         })
 
 
-def query_dms_management(query: str) -> str:
-    """
-    Query Management documents from DMS.
-    
-    **🔍 USES DATABASE INDEX: database_metadata/DMS_INDEX.txt**
-    This index contains file locations, naming patterns, and document categorization for all DMS documents.
-    
-    **Tool: Audit Summary Analyzer, KPI Dashboard Generator, Review Meeting Log Extractor**
-    
-    Args:
-        query: User query about audits, KPIs, approvals, etc.
-        
-    Returns:
-        Formatted string with management documents from APQR_Segregated/DMS/
-    """
-    logger.info(f"📊 DMS Management Tool called with query: {query}")
-    
-    # 🔍 NEW: Read the DMS database index for intelligent file search
-    dms_index = read_database_index("DMS")
-    if dms_index:
-        logger.info("✅ DMS database index loaded for intelligent file search")
-    
-    # List available DMS documents
-    available_docs = list_available_documents(DMS_DOCS_DIR)
-    
-    result = f"""**📊 Management Documents & Reports (DMS)**
+# Response templates for the listing-only DMS management and training tools; only the query and documents vary per call
+_MANAGEMENT_TEMPLATE = """**📊 Management Documents & Reports (DMS)**
 
 **Query:** {query}
 
-**Available Management Documents:** {len(available_docs)} files
+**Available Management Documents:** {count} files
 
 **Data Source:** DMS APQR_Segregated/DMS/
 
@@ -1069,7 +1720,7 @@ def query_dms_management(query: str) -> str:
 - Executive summaries
 - Quality metrics dashboards
 
-**Documents:** {', '.join(str(doc.name) for doc in available_docs[:10])}...
+**Documents:** {documents}...
 
 **Management Focus:**
 - Audit response and CAPA
@@ -1078,40 +1729,57 @@ def query_dms_management(query: str) -> str:
 - Management reviews
 - Strategic planning
 """
+
+
+def _render_dms_listing(template: str, query: str) -> str:
+    """
+    Fill a listing-only DMS response template from the cached DMS manifest.
     
-    return result
+    Args:
+        template: Response template with {query}, {count} and {documents} fields
+        query: User query echoed in the response
+        
+    Returns:
+        Formatted response naming the first 10 DMS documents
+    """
+    available_docs = get_document_manifest(DMS_DOCS_DIR)["all"]  # Cached manifest, read-only
+    return template.format(
+        query=query,
+        count=len(available_docs),
+        documents=', '.join(str(doc.name) for doc in available_docs[:10]),
+    )
 
 
-def query_dms_training(query: str) -> str:
+def query_dms_management(query: str) -> str:
     """
-    Query HR/Training documents from DMS.
+    Query Management documents from DMS.
     
     **🔍 USES DATABASE INDEX: database_metadata/DMS_INDEX.txt**
     This index contains file locations, naming patterns, and document categorization for all DMS documents.
     
-    **Tool: Training Matrix Reader, Competency Evaluation Extractor, Attendance Compliance Tracker**
+    **Tool: Audit Summary Analyzer, KPI Dashboard Generator, Review Meeting Log Extractor**
     
     Args:
-        query: User query about training, competency, certifications, etc.
+        query: User query about audits, KPIs, approvals, etc.
         
     Returns:
-        Formatted string with training documents from APQR_Segregated/DMS/
+        Formatted string with management documents from APQR_Segregated/DMS/
     """
-    logger.info(f"👨‍🎓 DMS Training Tool called with query: {query}")
+    logger.info(f"📊 DMS Management Tool called with query: {query}")
     
     # 🔍 NEW: Read the DMS database index for intelligent file search
     dms_index = read_database_index("DMS")
     if dms_index:
         logger.info("✅ DMS database index loaded for intelligent file search")
     
-    # List available DMS documents
-    available_docs = list_available_documents(DMS_DOCS_DIR)
-    
-    result = f"""**👨‍🎓 HR & Training Records (DMS)**
+    return _render_dms_listing(_MANAGEMENT_TEMPLATE, query)
+
+
+_TRAINING_TEMPLATE = """**👨‍🎓 HR & Training Records (DMS)**
 
 **Query:** {query}
 
-**Available Training Documents:** {len(available_docs)} files
+**Available Training Documents:** {count} files
 
 **Data Source:** DMS APQR_Segregated/DMS/
 
@@ -1130,7 +1798,7 @@ def query_dms_training(query: str) -> str:
 - Attendance records
 - Qualification documentation
 
-**Documents:** {', '.join(str(doc.name) for doc in available_docs[:10])}...
+**Documents:** {documents}...
 
 **Training Focus:**
 - Competency verification
@@ -1140,6 +1808,29 @@ def query_dms_training(query: str) -> str:
 - Curriculum management
 - Skills assessment
 """
+
+
+def query_dms_training(query: str) -> str:
+    """
+    Query HR/Training documents from DMS.
     
-    return result
+    **🔍 USES DATABASE INDEX: database_metadata/DMS_INDEX.txt**
+    This index contains file locations, naming patterns, and document categorization for all DMS documents.
+    
+    **Tool: Training Matrix Reader, Competency Evaluation Extractor, Attendance Compliance Tracker**
+    
+    Args:
+        query: User query about training, competency, certifications, etc.
+        
+    Returns:
+        Formatted string with training documents from APQR_Segregated/DMS/
+    """
+    logger.info(f"👨‍🎓 DMS Training Tool called with query: {query}")
+    
+    # 🔍 NEW: Read the DMS database index for intelligent file search
+    dms_index = read_database_index("DMS")
+    if dms_index:
+        logger.info("✅ DMS database index loaded for intelligent file search")
+    
+    return _render_dms_listing(_TRAINING_TEMPLATE, query)
 
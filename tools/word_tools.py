@@ -4,15 +4,179 @@ Handles Word document processing for batch records, procedures, and reports.
 """
 
 import logging
+import os
 import re
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-from docx import Document
+try:
+    from .parse_cache import file_cache
+except ImportError:
+    from parse_cache import file_cache
 
+# Field patterns for BMR/SOP parsing, tried in order (first match wins)
+_BMR_BATCH_PATTERNS = (
+    re.compile(r"Batch\s*(?:Number|No\.?|#)?\s*:?\s*([A-Z0-9\-]+)", re.IGNORECASE),
+    re.compile(r"BMR\s*(?:Number|No\.?|#)?\s*:?\s*([A-Z0-9\-]+)", re.IGNORECASE),
+)
+_BMR_PRODUCT_PATTERNS = (
+    re.compile(r"Product\s*(?:Name)?\s*:?\s*([A-Za-z0-9\s\-]+)", re.IGNORECASE),
+    re.compile(r"Material\s*:?\s*([A-Za-z0-9\s\-]+)", re.IGNORECASE),
+)
+_SOP_NUMBER_PATTERNS = (
+    re.compile(r"SOP\s*(?:Number|No\.?|#)?\s*:?\s*([A-Z0-9\-]+)", re.IGNORECASE),
+    re.compile(r"Document\s*(?:Number|No\.?)?\s*:?\s*([A-Z0-9\-]+)", re.IGNORECASE),
+)
+_SOP_TITLE_PATTERNS = (
+    re.compile(r"Title\s*:?\s*([^\n]+)", re.IGNORECASE),
+    re.compile(r"Procedure\s*(?:Name|Title)?\s*:?\s*([^\n]+)", re.IGNORECASE),
+)
+_SOP_DATE_PATTERNS = (
+    re.compile(r"Effective\s*Date\s*:?\s*([0-9\/\-]+)", re.IGNORECASE),
+    re.compile(r"Revision\s*Date\s*:?\s*([0-9\/\-]+)", re.IGNORECASE),
+)
 
+# Levels of detail parse_bmr_docx can return
+BMR_DETAIL_LEVELS = ("full", "summary")
+
+# Parsed BMR/SOP records kept in memory per parser, so repeated agent calls on the same
+# unchanged document skip reading the on-disk parse cache
+PARSED_RECORD_MEMORY_ENTRIES = 32
+
+# Numbered procedure steps in SOP text
+_PROCEDURE_STEP_RE = re.compile(r"(\d+\.?\d*)\s+([^\n]+)")
+
+# (Document, PackageNotFoundError) from python-docx, imported on first DOCX access so that
+# importing this module does not load python-docx and lxml
+_DOCX_API: Optional[Tuple[Callable[[str], Any], type]] = None
+
+
+def _docx_api() -> Tuple[Callable[[str], Any], type]:
+    """Import python-docx on first use and return (Document, PackageNotFoundError)."""
+    global _DOCX_API
+    if _DOCX_API is None:
+        from docx import Document
+        from docx.opc.exceptions import PackageNotFoundError
+        _DOCX_API = (Document, PackageNotFoundError)
+    return _DOCX_API
+
+
+def _load_docx(docx_path: str) -> Any:
+    """Open a Word document with python-docx."""
+    return _docx_api()[0](docx_path)
+
+
+def _open_docx(docx_path: str) -> Optional[Any]:
+    """
+    Open a Word document, or return None if the file does not exist.
+    
+    The open itself is the existence check; the file is only stat'ed after a failed
+    open, to tell a missing file from a corrupt one (python-docx reports both as
+    PackageNotFoundError).
+    """
+    document_class, package_not_found = _docx_api()
+    try:
+        return document_class(docx_path)
+    except (package_not_found, FileNotFoundError):
+        if os.path.exists(docx_path):
+            raise
+        return None
+
+
+def _docx_text(doc: Any) -> str:
+    """
+    Join the non-blank body paragraphs of an open document.
+    
+    Reads the <w:p> elements directly (the same ones doc.paragraphs wraps) so no
+    Paragraph wrapper is built, and each paragraph's text is assembled only once.
+    """
+    texts = (p.text for p in doc.element.body.p_lst)
+    return '\n'.join(text for text in texts if text.strip())
+
+
+def _row_cell_texts(tr: Any) -> List[str]:
+    """
+    Stripped text of each layout-grid cell in a <w:tr>, as row.cells would give it.
+    
+    A horizontally spanned cell repeats once per grid column and a vertically merged
+    continuation cell repeats the cell above it. Each <w:tc> is read once from its
+    <w:p> children, with no _Cell or Paragraph wrappers built.
+    """
+    texts = []
+    for tc in tr.tc_lst:
+        root = tc
+        while root.vMerge == "continue":
+            root = root._tc_above
+        text = '\n'.join(p.text for p in root.p_lst).strip()
+        texts.extend([text] * root.grid_span)
+    return texts
+
+
+def _docx_tables(doc: Any) -> List[Dict[str, Any]]:
+    """Extract every table of an open document as rows of stripped cell text."""
+    all_tables = []
+    for table_idx, table in enumerate(doc.tables, 1):
+        table_data = [_row_cell_texts(tr) for tr in table._tbl.tr_lst]
+        
+        all_tables.append({
+            "table_id": f"table_{table_idx}",
+            "data": table_data,
+            "rows": len(table_data),
+            "columns": len(table_data[0]) if table_data else 0
+        })
+    return all_tables
+
+
+def _docx_properties(doc: Any) -> Dict[str, Any]:
+    """Core properties and paragraph/table counts of an open document."""
+    core_props = doc.core_properties
+    return {
+        "docx_metadata": {
+            "author": core_props.author,
+            "created": str(core_props.created) if core_props.created else None,
+            "modified": str(core_props.modified) if core_props.modified else None,
+            "title": core_props.title,
+            "subject": core_props.subject
+        },
+        "num_paragraphs": len(doc.paragraphs),
+        "num_tables": len(doc.tables)
+    }
+
+
+def _read_docx(docx_path: str, with_tables: bool = True) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Read a DOCX's text, tables and metadata from a single open.
+    
+    Produces the same values as extract_text_from_docx, extract_tables_from_docx and
+    extract_metadata_from_docx without unzipping and parsing the document three times.
+    
+    Args:
+        docx_path: Path to DOCX file
+        with_tables: Extract the tables (an empty list is returned otherwise)
+        
+    Returns:
+        Tuple of (text, tables, metadata)
+    """
+    path = Path(docx_path)
+    stat = path.stat()
+    metadata = {
+        "filename": path.name,
+        "size_bytes": stat.st_size,
+        "size_kb": round(stat.st_size / 1024, 2),
+        "path": str(path),
+        "exists": True
+    }
+    doc = _load_docx(docx_path)
+    try:
+        metadata.update(_docx_properties(doc))
+    except Exception as e:
+        logger.error(f"Error reading DOCX metadata: {e}")
+    return _docx_text(doc), _docx_tables(doc) if with_tables else [], metadata
+
+
+@file_cache()
 def extract_text_from_docx(docx_path: str) -> str:
     """
     Extract text content from Word document.
@@ -26,19 +190,11 @@ def extract_text_from_docx(docx_path: str) -> str:
     logger.info(f"Extracting text from DOCX: {docx_path}")
     
     try:
-        path = Path(docx_path)
-        if not path.exists():
+        doc = _open_docx(docx_path)
+        if doc is None:
             return f"Error: File not found: {docx_path}"
         
-        doc = Document(docx_path)
-        text_content = []
-        
-        # Extract text from paragraphs
-        for para in doc.paragraphs:
-            if para.text.strip():
-                text_content.append(para.text)
-        
-        return '\n'.join(text_content)
+        return _docx_text(doc)
     except Exception as e:
         logger.error(f"Error extracting text from DOCX: {e}")
         return f"Error: {str(e)}"
@@ -57,80 +213,65 @@ def extract_tables_from_docx(docx_path: str) -> List[Dict[str, Any]]:
     logger.info(f"Extracting tables from DOCX: {docx_path}")
     
     try:
-        path = Path(docx_path)
-        if not path.exists():
+        doc = _open_docx(docx_path)
+        if doc is None:
             return [{"error": f"File not found: {docx_path}"}]
         
-        doc = Document(docx_path)
-        all_tables = []
-        
-        for table_idx, table in enumerate(doc.tables, 1):
-            table_data = []
-            for row in table.rows:
-                row_data = [cell.text.strip() for cell in row.cells]
-                table_data.append(row_data)
-            
-            all_tables.append({
-                "table_id": f"table_{table_idx}",
-                "data": table_data,
-                "rows": len(table_data),
-                "columns": len(table_data[0]) if table_data else 0
-            })
-        
-        return all_tables
+        return _docx_tables(doc)
     except Exception as e:
         logger.error(f"Error extracting tables from DOCX: {e}")
         return [{"error": str(e)}]
 
 
-def parse_bmr_docx(docx_path: str) -> Dict[str, Any]:
+@file_cache(memory_entries=PARSED_RECORD_MEMORY_ENTRIES)
+def parse_bmr_docx(docx_path: str, *, detail: str = "full") -> Dict[str, Any]:
     """
     Parse Batch Manufacturing Record (BMR) from Word document.
     
     Args:
         docx_path: Path to BMR DOCX file
+        detail: "full" for the complete record, or "summary" for the batch number,
+            product name and file metadata only (no raw text, tables or steps)
         
     Returns:
         Structured BMR data with batch info, manufacturing steps
     """
     logger.info(f"Parsing BMR from DOCX: {docx_path}")
     
+    if detail not in BMR_DETAIL_LEVELS:
+        return {
+            "document_type": "BMR",
+            "error": f"Unknown detail level '{detail}' (expected one of: {', '.join(BMR_DETAIL_LEVELS)})",
+            "source": docx_path
+        }
+    
     try:
-        text = extract_text_from_docx(docx_path)
-        tables = extract_tables_from_docx(docx_path)
+        full = detail == "full"
+        text, tables, metadata = _read_docx(docx_path, with_tables=full)
         
         bmr_data = {
             "document_type": "Batch Manufacturing Record (BMR)",
             "source": docx_path,
-            "raw_text": text,
-            "tables": tables,
-            "manufacturing_steps": [],
-            "metadata": extract_metadata_from_docx(docx_path)
         }
+        if full:
+            bmr_data.update({"raw_text": text, "tables": tables, "manufacturing_steps": []})
+        bmr_data["metadata"] = metadata
         
         # Extract batch number
-        batch_patterns = [
-            r"Batch\s*(?:Number|No\.?|#)?\s*:?\s*([A-Z0-9\-]+)",
-            r"BMR\s*(?:Number|No\.?|#)?\s*:?\s*([A-Z0-9\-]+)"
-        ]
-        for pattern in batch_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _BMR_BATCH_PATTERNS:
+            match = pattern.search(text)
             if match:
                 bmr_data["batch_number"] = match.group(1)
                 break
         
         # Extract product name
-        product_patterns = [
-            r"Product\s*(?:Name)?\s*:?\s*([A-Za-z0-9\s\-]+)",
-            r"Material\s*:?\s*([A-Za-z0-9\s\-]+)"
-        ]
-        for pattern in product_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _BMR_PRODUCT_PATTERNS:
+            match = pattern.search(text)
             if match:
                 bmr_data["product_name"] = match.group(1).strip()
                 break
         
-        # Parse manufacturing steps from tables
+        # Parse manufacturing steps from tables (none are read for a summary)
         for table_info in tables:
             table_data = table_info.get("data", [])
             if table_data and len(table_data) > 1:
@@ -151,6 +292,7 @@ def parse_bmr_docx(docx_path: str) -> Dict[str, Any]:
         }
 
 
+@file_cache(memory_entries=PARSED_RECORD_MEMORY_ENTRIES)
 def parse_sop_docx(docx_path: str) -> Dict[str, Any]:
     """
     Parse Standard Operating Procedure (SOP) from Word document.
@@ -164,8 +306,7 @@ def parse_sop_docx(docx_path: str) -> Dict[str, Any]:
     logger.info(f"Parsing SOP from DOCX: {docx_path}")
     
     try:
-        text = extract_text_from_docx(docx_path)
-        tables = extract_tables_from_docx(docx_path)
+        text, tables, metadata = _read_docx(docx_path)
         
         sop_data = {
             "document_type": "Standard Operating Procedure (SOP)",
@@ -173,49 +314,36 @@ def parse_sop_docx(docx_path: str) -> Dict[str, Any]:
             "raw_text": text,
             "tables": tables,
             "procedures": [],
-            "metadata": extract_metadata_from_docx(docx_path)
+            "metadata": metadata
         }
         
         # Extract SOP number
-        sop_patterns = [
-            r"SOP\s*(?:Number|No\.?|#)?\s*:?\s*([A-Z0-9\-]+)",
-            r"Document\s*(?:Number|No\.?)?\s*:?\s*([A-Z0-9\-]+)"
-        ]
-        for pattern in sop_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _SOP_NUMBER_PATTERNS:
+            match = pattern.search(text)
             if match:
                 sop_data["sop_number"] = match.group(1)
                 break
         
         # Extract title
-        title_patterns = [
-            r"Title\s*:?\s*([^\n]+)",
-            r"Procedure\s*(?:Name|Title)?\s*:?\s*([^\n]+)"
-        ]
-        for pattern in title_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _SOP_TITLE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 sop_data["title"] = match.group(1).strip()
                 break
         
         # Extract effective date
-        date_patterns = [
-            r"Effective\s*Date\s*:?\s*([0-9\/\-]+)",
-            r"Revision\s*Date\s*:?\s*([0-9\/\-]+)"
-        ]
-        for pattern in date_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _SOP_DATE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 sop_data["effective_date"] = match.group(1)
                 break
         
         # Parse procedure steps from numbered lists
-        procedure_pattern = r"(\d+\.?\d*)\s+([^\n]+)"
-        procedure_matches = re.findall(procedure_pattern, text)
-        for step_num, step_text in procedure_matches:
+        for match in _PROCEDURE_STEP_RE.finditer(text):
+            step_text = match.group(2)
             if len(step_text) > 10:  # Filter out short matches
                 sop_data["procedures"].append({
-                    "step": step_num,
+                    "step": match.group(1),
                     "description": step_text.strip()
                 })
         
@@ -244,34 +372,25 @@ def extract_metadata_from_docx(docx_path: str) -> Dict[str, Any]:
     
     try:
         path = Path(docx_path)
-        if path.exists():
-            stat = path.stat()
-            metadata = {
-                "filename": path.name,
-                "size_bytes": stat.st_size,
-                "size_kb": round(stat.st_size / 1024, 2),
-                "path": str(path),
-                "exists": True
-            }
-            
-            # Extract DOCX-specific metadata
-            try:
-                doc = Document(docx_path)
-                core_props = doc.core_properties
-                metadata["docx_metadata"] = {
-                    "author": core_props.author,
-                    "created": str(core_props.created) if core_props.created else None,
-                    "modified": str(core_props.modified) if core_props.modified else None,
-                    "title": core_props.title,
-                    "subject": core_props.subject
-                }
-                metadata["num_paragraphs"] = len(doc.paragraphs)
-                metadata["num_tables"] = len(doc.tables)
-            except Exception as e:
-                logger.error(f"Error reading DOCX metadata: {e}")
-            
-            return metadata
-        return {"filename": path.name, "exists": False}
+        try:
+            stat = path.stat()  # One stat call instead of exists() + stat()
+        except FileNotFoundError:
+            return {"filename": path.name, "exists": False}
+        metadata = {
+            "filename": path.name,
+            "size_bytes": stat.st_size,
+            "size_kb": round(stat.st_size / 1024, 2),
+            "path": str(path),
+            "exists": True
+        }
+        
+        # Extract DOCX-specific metadata
+        try:
+            metadata.update(_docx_properties(_load_docx(docx_path)))
+        except Exception as e:
+            logger.error(f"Error reading DOCX metadata: {e}")
+        
+        return metadata
     except Exception as e:
         logger.error(f"Error extracting metadata from DOCX: {e}")
         return {"error": str(e)}